@@ -11,13 +11,13 @@
 from datetime import datetime
 import re
 # 3rd party imports
-from flask import session
+from flask import current_app as app, session
 from pymongo.errors import DuplicateKeyError
 from werkzeug.security import (generate_password_hash as generate_password,
                                check_password_hash as check_password)
 # Pjuu imports
 from pjuu import mongo as m, redis as r, storage
-from pjuu.auth.utils import get_user
+from pjuu.auth.utils import forget_username, get_user
 from pjuu.lib import keys as k, timestamp, get_uuid
 from pjuu.posts.backend import delete_post
 
@@ -70,6 +70,21 @@ RESERVED_NAMES = [
     'webmail']
 
 
+def hash_password(password):
+    """Hash a plain-text `password` ready to be stored.
+
+    The method and salt length come from `PASSWORD_HASH_METHOD` and
+    `PASSWORD_SALT_LENGTH` in the settings. The method is stored as part of
+    the hash so changing it doesn't stop existing passwords from working.
+
+    """
+    return generate_password(
+        password,
+        method=app.config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000'),
+        salt_length=app.config.get('PASSWORD_SALT_LENGTH', 20)
+    )
+
+
 def create_account(username, email, password):
     """Creates a new user account.
 
@@ -95,9 +110,7 @@ def create_account(username, email, password):
                 '_id': uid,
                 'username': username.lower(),
                 'email': email.lower(),
-                'password': generate_password(password,
-                                              method='pbkdf2:sha256:2000',
-                                              salt_length=20),
+                'password': hash_password(password),
                 'created': timestamp(),
                 'last_login': -1,
                 'active': False,
@@ -226,6 +239,12 @@ def activate(user_id, action=True):
     """Activates a user account and removes 'ttl' key from Mongo
 
     """
+    if not action:
+        # Stop the user being found by username as an active user
+        user = m.db.users.find_one({'_id': user_id}, {'username': True})
+        if user is not None:
+            forget_username(user.get('username'))
+
     return m.db.users.update(
         {'_id': user_id},
         {'$set': {'active': action}, '$unset': {'ttl': None}}
@@ -275,9 +294,7 @@ def change_password(user_id, password):
 
     """
     # Create the password hash from the plain-text password
-    password = generate_password(password,
-                                 method='pbkdf2:sha256:2000',
-                                 salt_length=20)
+    password = hash_password(password)
 
     return m.db.users.update({'_id': user_id},
                              {'$set': {'password': password}})
@@ -311,6 +328,7 @@ def delete_account(user_id):
 
     # Delete the user from MongoDB
     m.db.users.remove({'_id': user_id})
+    forget_username(user.get('username'))
 
     # If the user has an avatar remove it
     if user.get('avatar'):
@@ -346,8 +364,13 @@ def delete_account(user_id):
     for followee_id in followee_cursor:
         # Clear the followers list of people uid is following
         r.zrem(k.USER_FOLLOWERS.format(followee_id), user_id)
+        # Only followers can be approved, so this is the only place the user
+        # can be in someone else's approved list
+        r.zrem(k.USER_APPROVED.format(followee_id), user_id)
     # Delete the following list
     r.delete(k.USER_FOLLOWING.format(user_id))
+    # Delete the list of followers the user approved
+    r.delete(k.USER_APPROVED.format(user_id))
 
     # Delete the users feed, this may have been added too during this process.
     # Probably not but let's be on the safe side
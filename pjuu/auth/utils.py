@@ -9,7 +9,10 @@ circular imports.
 """
 
 
-from pjuu import mongo as m
+from flask import abort
+
+from pjuu import mongo as m, redis as r
+from pjuu.lib import keys as k
 
 
 def get_uid_username(username, non_active=False):
@@ -23,9 +26,17 @@ def get_uid_username(username, non_active=False):
     :rtype: str or None
 
     """
+    username = username.lower()
+
+    # Active users are looked up on nearly every page so they are cached
+    if not non_active:
+        user_id = r.get(k.USERNAME.format(username))
+        if user_id is not None:
+            return user_id
+
     # Will return the user object with on the _id (user_id) field
     query_dict = {
-        'username': username.lower()
+        'username': username
     }
 
     if not non_active:
@@ -34,11 +45,52 @@ def get_uid_username(username, non_active=False):
     user = m.db.users.find_one(query_dict, {})
 
     if user is not None:
+        if not non_active:
+            r.setex(k.USERNAME.format(username), k.USERNAME_TIMEOUT,
+                    user.get('_id'))
+
         return user.get('_id')
 
     return None
 
 
+def forget_username(username):
+    """Removes `username` from the lookup cache used by `get_uid_username`.
+
+    Call this whenever a user is deleted or deactivated.
+
+    :param username: The username to forget
+    :type username: str
+
+    """
+    r.delete(k.USERNAME.format(username.lower()))
+
+
+def get_uids_username(usernames, non_active=False):
+    """Find the uids of all `usernames` with a single lookup.
+
+    :param usernames: The usernames to lookup
+    :type usernames: list
+    :param non_active: Allow looking up non-active users
+    :type non_active: bool
+    :returns: The (lower case) usernames which were found mapped to UIDs
+    :rtype: dict
+
+    """
+    query_dict = {
+        'username': {
+            '$in': list(set(username.lower() for username in usernames))
+        }
+    }
+
+    if not non_active:
+        query_dict['active'] = True
+
+    cursor = m.db.users.find(query_dict, {'username': True})
+
+    return dict((user.get('username'), user.get('_id')) for user in cursor)
+
+
 def get_uid_email(email, non_active=False):
     """Find a uid given a username.
 
@@ -84,6 +136,26 @@ def get_uid(lookup_value, non_active=False):
         return get_uid_username(lookup_value, non_active=non_active)
 
 
+def get_uid_or_404(lookup_value):
+    """Calls `get_uid` and aborts the current request with a 404 if there is
+    no (active) user for `lookup_value`.
+
+    .. note: Only use this from inside a view.
+
+    :param lookup_value: The value to lookup
+    :type lookup_value: str
+    :returns: The users UID
+    :rtype: str
+
+    """
+    user_id = get_uid(lookup_value)
+
+    if user_id is None:
+        abort(404)
+
+    return user_id
+
+
 def get_user(user_id):
     """Get user with `user_id` as `dict`.
 
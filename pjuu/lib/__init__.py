@@ -12,7 +12,11 @@ from time import time
 from urllib.parse import urlparse, urljoin
 from uuid import uuid1
 
-from flask import request, flash
+from flask import (
+    current_app as app, flash, get_flashed_messages, request,
+    stream_with_context, Response
+)
+from flask_wtf.csrf import generate_csrf
 
 
 def is_safe_url(host_url, target):
@@ -68,3 +72,22 @@ def xflash(message, category='message'):
     """Will only flash the message if the request is NOT XHR"""
     if not is_xhr():
         flash(message, category)
+
+
+def stream_template(template_name, **context):
+    """Like `render_template` but the page is sent as it is rendered, rather
+    than once all of it has been.
+
+    The session is saved before any of the page is sent so anything the
+    template would store in the session (flashed messages being removed and
+    the CSRF token) is done before the response is returned.
+
+    """
+    get_flashed_messages()
+    generate_csrf()
+
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(5)
+
+    return Response(stream_with_context(stream))
@@ -20,7 +20,7 @@ from collections import Iterable
 import jsonpickle
 from werkzeug.utils import cached_property
 # Pjuu imports
-from pjuu import redis as r
+from pjuu import mongo as m, redis as r
 from pjuu.auth.utils import get_user as be_get_user
 from pjuu.lib import keys as k, timestamp, get_uuid
 
@@ -79,23 +79,69 @@ class AlertManager(object):
         """Attempts to load an Alert from Redis and unpickle it.
 
         """
-        # Try the unpickling process
-        try:
-            pickled_alert = r.get(k.ALERT.format(aid))
-            alert = jsonpickle.decode(pickled_alert)
-        except (TypeError, ValueError):
-            # We failed to get an alert for whateva reason
-            return None
-
-        # Ensure we got an alert and that it verifies.
-        if alert.verify():
-            # Return the alert object
-            return alert
-        else:
-            # If the alert did not verify delete it
-            # This will stop this always being called
-            r.delete(k.ALERT.format(aid))
-            return None
+        return self.get_many([aid])[0]
+
+    def get_many(self, aids):
+        """Loads all the alerts in `aids` at once.
+
+        The alerts are fetched from Redis with one MGET. The users who caused
+        them and, for alerts about a post (those with a `post_id`), the posts
+        are each loaded from MongoDB with a single `$in` query.
+
+        Returns a list the same length as `aids` containing the alert or
+        `None` if it could not be loaded.
+
+        """
+        if not aids:
+            return []
+
+        pickled_alerts = r.mget([k.ALERT.format(aid) for aid in aids])
+
+        alerts = []
+        for pickled_alert in pickled_alerts:
+            # Try the unpickling process
+            try:
+                alert = jsonpickle.decode(pickled_alert)
+            except (TypeError, ValueError):
+                # We failed to get an alert for whateva reason
+                alert = None
+            alerts.append(alert)
+
+        # Load all the users at once and cache them on the alerts
+        user_ids = list(set(alert.user_id for alert in alerts if alert))
+        cursor = m.db.users.find({'_id': {'$in': user_ids}})
+        users = dict((user.get('_id'), user) for user in cursor)
+
+        for alert in alerts:
+            if alert:
+                alert.__dict__['user'] = users.get(alert.user_id)
+
+        # Only the post's author is needed to verify the alert and build its
+        # URL. Alerts not about a post don't have a `post_id`.
+        post_ids = list(set(alert.post_id for alert in alerts
+                            if alert and hasattr(alert, 'post_id')))
+        if post_ids:
+            cursor = m.db.posts.find({'_id': {'$in': post_ids}},
+                                     {'username': True})
+            posts = dict((post.get('_id'), post) for post in cursor)
+
+            for alert in alerts:
+                if alert and hasattr(alert, 'post_id'):
+                    alert.__dict__['post'] = posts.get(alert.post_id)
+
+        results = []
+        for aid, alert in zip(aids, alerts):
+            # Ensure we got an alert and that it verifies.
+            if alert and alert.verify():
+                results.append(alert)
+            else:
+                if alert:
+                    # If the alert did not verify delete it
+                    # This will stop this always being called
+                    r.delete(k.ALERT.format(aid))
+                results.append(None)
+
+        return results
 
     def alert(self, alert, user_ids):
         """Will attempt to alert the user with uid to the alert being managed.
@@ -113,12 +159,16 @@ class AlertManager(object):
         if not isinstance(user_ids, Iterable) or isinstance(user_ids, str):
             raise TypeError('user_ids must be iterable')
 
-        # Create the alert object
-        r.set(k.ALERT.format(alert.alert_id), jsonpickle.encode(alert))
-        # Set the 4WK timeout on it
-        r.expire(k.ALERT.format(alert.alert_id), k.EXPIRE_4WKS)
+        # Send the alert and every users alert entry to Redis in one go
+        pipe = r.pipeline(transaction=False)
+
+        # Create the alert object with the 4WK timeout on it
+        pipe.set(k.ALERT.format(alert.alert_id), jsonpickle.encode(alert),
+                 ex=k.EXPIRE_4WKS)
 
         for user_id in user_ids:
-            r.zadd(k.USER_ALERTS.format(user_id), {
+            pipe.zadd(k.USER_ALERTS.format(user_id), {
                 str(alert.alert_id): alert.timestamp
             })
+
+        pipe.execute()
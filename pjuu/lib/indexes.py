@@ -10,6 +10,7 @@ it will have no effect on indexes which are already there.
 
 # 3rd party imports
 import pymongo
+from pymongo.errors import OperationFailure
 # Pjuu imports
 from pjuu import mongo as m
 from pjuu.lib import keys as k
@@ -42,15 +43,41 @@ def ensure_indexes():
     )
 
     # Post indexes
-    # Allow us to see all posts made by a user
+    # These indexes have been replaced by the compound indexes below. Drop
+    # them from existing databases so every post write does not have to keep
+    # both up to date.
+    superseded = [
+        [('user_id', pymongo.DESCENDING)],
+        [('reply_to', pymongo.DESCENDING)],
+        [('hashtags.hashtag', pymongo.DESCENDING)],
+        [('user_id', pymongo.DESCENDING), ('created', pymongo.DESCENDING)]
+    ]
+    for index in superseded:
+        try:
+            m.db.posts.drop_index(index)
+        except OperationFailure:
+            # The index does not exist (anymore)
+            pass
+
+    # The lists of posts are all shown newest (or oldest) first so `created`
+    # is included in each index. MongoDB can then walk the index in order
+    # rather than sorting the matches in memory.
+    # Allow us to see all posts made by a user. Profiles page through posts
+    # by `created` then `_id`.
     m.db.posts.ensure_index(
-        [('user_id', pymongo.DESCENDING)]
+        [('user_id', pymongo.DESCENDING), ('created', pymongo.DESCENDING),
+         ('_id', pymongo.DESCENDING)]
     )
     # Allow us to find all replies on a post
     m.db.posts.ensure_index(
-        [('reply_to', pymongo.DESCENDING)]
+        [('reply_to', pymongo.DESCENDING), ('created', pymongo.DESCENDING)]
     )
     # Index hash tags within posts
     m.db.posts.ensure_index(
-        [('hashtags.hashtag', pymongo.DESCENDING)]
+        [('hashtags.hashtag', pymongo.DESCENDING),
+         ('created', pymongo.DESCENDING)]
+    )
+    # Allow us to show the global feed
+    m.db.posts.ensure_index(
+        [('created', pymongo.DESCENDING)]
     )
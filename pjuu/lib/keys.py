@@ -83,6 +83,20 @@ ALERT = "{{alert:{0}}}"
 # Return: str
 TOKEN = "{{token:{0}}}"
 
+# Cached user_id of an active user, formatted with the (lower case) username
+# Return: str
+USERNAME = "{{username:{0}}}"
+
+# How long a username lookup is cached for
+USERNAME_TIMEOUT = 5 * 60
+
+# Cached list of the highest scoring users, formatted with the list length
+# Return: str
+TOP_USERS = "{{top_users:{0}}}"
+
+# How long the highest scoring users are cached for
+TOP_USERS_TIMEOUT = 60
+
 # Tip names
 # Uses around the site to discover valid tip name
 # NOT TECHNICALLY A KEY BUT WE NEED TO KNOW
@@ -0,0 +1,62 @@
+# -*- coding: utf8 -*-
+
+"""Lua scripts which Pjuu runs inside Redis.
+
+These are plain strings. Register them against the Redis connection at the
+point of use with `r.register_script()`, redis-py will take care of
+EVALSHA/SCRIPT LOAD for us.
+
+:license: AGPL v3, see LICENSE for more details
+:copyright: 2014-2021 Joe Doherty
+
+"""
+
+# Adds post ARGV[1] with the score ARGV[2] (the posts created time) to every
+# feed in KEYS and stops each feed from growing to large. Most feeds are well
+# under the limit so only trim the ones which have reached it.
+# Returns: the number of feeds touched
+POPULATE_FEEDS = """
+for _, feed in ipairs(KEYS) do
+    redis.call('ZADD', feed, ARGV[2], ARGV[1])
+    if redis.call('ZCARD', feed) >= 1000 then
+        redis.call('ZREMRANGEBYRANK', feed, 0, -1000)
+    end
+end
+return #KEYS
+"""
+
+# Records user ARGV[1]'s vote on the post whose votes zset is KEYS[1].
+# ARGV[2] is the vote (-1 or 1), ARGV[3] the time to check the vote timeout
+# against, ARGV[4] the score to store (the vote multiplied by the current time)
+# and ARGV[5] is how long a vote can be changed for.
+# Returns: nil if the user has already voted and can no longer change it,
+#          else {amount to change the scores by, the result of the vote}
+VOTE_POST = """
+local amount = tonumber(ARGV[2])
+local voted = redis.call('ZSCORE', KEYS[1], ARGV[1])
+
+if not voted then
+    redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+    return {amount, amount}
+end
+
+voted = tonumber(voted)
+if math.abs(voted) + tonumber(ARGV[5]) <= tonumber(ARGV[3]) then
+    return nil
+end
+
+local previous_vote = 1
+if voted < 0 then
+    previous_vote = -1
+end
+
+redis.call('ZREM', KEYS[1], ARGV[1])
+
+-- Voting the same way again reverses the vote
+if amount == previous_vote then
+    return {-previous_vote, 0}
+end
+
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+return {2 * amount, amount}
+"""
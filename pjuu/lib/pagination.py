@@ -11,12 +11,15 @@ interface to handle the issue.
 """
 
 # Stdlib imports
-from math import ceil
+from math import ceil, isfinite
 
 
 # Max number of pages (don't worry thats a lot of posts/followers)
 MAX_PAGES = 4294967295
 
+# Characters allowed in a 'before_id', these are the ids from get_uuid()
+HEX_DIGITS = frozenset('0123456789abcdef')
+
 
 class Pagination(object):
     """Pagination object. Every page which supports the 'page' should
@@ -24,10 +27,20 @@ class Pagination(object):
 
     """
 
-    def __init__(self, items, total, page=1, per_page=50):
+    def __init__(self, items, total, page=1, per_page=50, next_before=None,
+                 next_before_id=None, has_next=False):
         self.items = items
+        # `total` can be `None` for lists which are too expensive to count.
+        # `has_next` then says if there is another page.
         self.total = total
+        self.has_next = has_next
         self.per_page = per_page
+        # The `created` time and `_id` of the last item. Lists which support
+        # it can use these to find the next page without skipping over the
+        # earlier ones. The `_id` breaks ties between items created at the
+        # same time.
+        self.next_before = next_before
+        self.next_before_id = next_before_id
         # Ensure page can not be lower than 1
         if page < 1:
             self.page = 1
@@ -43,7 +56,9 @@ class Pagination(object):
         """Calculate the total number of pages
 
         """
-        if self.per_page == 0:
+        if self.total is None:
+            pages = None
+        elif self.per_page == 0:
             pages = 0
         else:
             pages = int(ceil(self.total / float(self.per_page)))
@@ -51,12 +66,12 @@ class Pagination(object):
 
     @property
     def has_pages(self):
-        return (self.page < self.pages) or (self.page > 1)
+        return self.next_page is not None or (self.page > 1)
 
     @property
     def prev_page(self):
         if self.page > 1:
-            if self.page > self.pages:
+            if self.pages is not None and self.page > self.pages:
                 return self.pages
             return self.page - 1
         return None
@@ -67,6 +82,8 @@ class Pagination(object):
 
     @property
     def next_page(self):
+        if self.pages is None:
+            return self.page + 1 if self.has_next else None
         if self.page < self.pages:
             return self.page + 1
         return None
@@ -81,17 +98,45 @@ def handle_page(request):
 
     """
     page = request.args.get('page', None)
-    # Ensure the page is a valid integer
-    try:
-        page = int(page)
-        # Catch this twice as this value is also used with Redis to get
-        # the relevant ranges from lists and sorted sets
-        if page > MAX_PAGES:
-            page = MAX_PAGES
-        # Pages can't be lower than one
-        if page < 1:
+
+    # Ensure the page is a valid integer, if not presume the page is 1.
+    # Checking the string first avoids raising an exception for every bad
+    # value.
+    if isinstance(page, str):
+        try:
+            page = int(page) if page.isdecimal() else 1
+        except ValueError:
+            # Python limits how many digits int() will convert
             page = 1
-    except (TypeError, ValueError):
-        # If there was a problem presume the page is 1
+    elif not isinstance(page, int) or isinstance(page, bool):
         page = 1
-    return page
+
+    # Catch this twice as this value is also used with Redis to get the
+    # relevant ranges from lists and sorted sets. Pages can't be lower than one
+    return max(1, min(page, MAX_PAGES))
+
+
+def handle_before(request):
+    """Will handle passing 'before' and 'before_id' to a view and ensure they
+    are safe.
+
+    Returns a `(before, before_id)` tuple. `before` is `None` if there isn't a
+    valid 'before' in the request. `before_id` is `None` if there isn't a
+    valid 'before_id' (a hex UUID) or no valid 'before'.
+
+    """
+    try:
+        before = float(request.args.get('before', None))
+    except (TypeError, ValueError):
+        return None, None
+
+    # Don't allow 'nan' or 'inf'
+    if not isfinite(before):
+        return None, None
+
+    before_id = request.args.get('before_id', None)
+    if not isinstance(before_id, str) or len(before_id) != 32 or \
+            not set(before_id) <= HEX_DIGITS:
+        before_id = None
+
+    return before, before_id
@@ -13,7 +13,7 @@
 
 import re
 
-from pjuu.auth.utils import get_uid_username
+from pjuu.auth.utils import get_uids_username
 from pjuu.lib import fix_url
 
 
@@ -54,12 +54,15 @@ URL_RE = re.compile(URL_RE_PATTERN)
 
 DELIMITERS = r'\(\)\[\]\{\}\.\;\,\:\?\!\ \t\r\n\'\"'
 
+# Mentions and hashtags have to be surrounded by a delimiter or the start/end
+# of the post. "Not next to a non-delimiter" covers both cases with a single
+# lookaround each side, rather than an alternation.
 MENTION_RE = re.compile(
-    r'(?:^|(?<=[{0}]))@(\w{{3,16}})(?:$|(?=[{0}]))'.format(DELIMITERS)
+    r'(?<![^{0}])@(\w{{3,16}})(?![^{0}])'.format(DELIMITERS)
 )
 
 HASHTAG_RE = re.compile(
-    r'(?:^|(?<=[{0}]))#(\w{{2,32}})(?:$|(?=[{0}]))'.format(DELIMITERS)
+    r'(?<![^{0}])#(\w{{2,32}})(?![^{0}])'.format(DELIMITERS)
 )
 
 
@@ -69,6 +72,11 @@ def parse_links(body):
     .. note: This will need to be refined as edge cases are discovered.
 
     """
+    # Every URL the pattern matches contains a `:` or a `.`, don't run the
+    # (very large) pattern over posts which can't contain a link
+    if ':' not in body and '.' not in body:
+        return []
+
     links = URL_RE.finditer(body)
 
     result = []
@@ -87,13 +95,23 @@ def parse_mentions(body, check_user=True):
     .. note: This will need to be refined as edge cases are discovered.
 
     """
-    mentions = MENTION_RE.finditer(body)
+    if '@' not in body:
+        return []
+
+    mentions = list(MENTION_RE.finditer(body))
+
+    # Look up all the mentioned users at once rather than one per mention
+    if check_user and mentions:
+        user_ids = get_uids_username(
+            [mention.group(1) for mention in mentions])
+    else:
+        user_ids = {}
 
     result = []
     for mention in mentions:
         username = mention.group(1)
         if check_user:
-            user_id = get_uid_username(username)
+            user_id = user_ids.get(username.lower())
         else:
             user_id = 'NA'
 
@@ -113,6 +131,9 @@ def parse_hashtags(body):
     .. note: This will need to be refined as edge cases are discovered.
 
     """
+    if '#' not in body:
+        return []
+
     hashtags = HASHTAG_RE.finditer(body)
 
     result = []
@@ -12,10 +12,11 @@ within Redis and MongoDB
 # 3rd party imports
 from flask import current_app as app, url_for
 from jinja2.filters import do_capitalize
+from werkzeug.utils import cached_property
 
 # Pjuu imports
 from pjuu import mongo as m, redis as r, celery, storage
-from pjuu.lib import keys as k, timestamp, get_uuid
+from pjuu.lib import keys as k, lua, timestamp, get_uuid
 from pjuu.lib.alerts import BaseAlert, AlertManager
 from pjuu.lib.pagination import Pagination
 from pjuu.lib.parser import parse_post
@@ -25,6 +26,12 @@ from pjuu.lib.uploads import process_upload
 # Allow chaning the maximum length of a post
 MAX_POST_LENGTH = 500
 
+# Number of followers whose feeds are updated per Redis script call
+FEED_BATCH_SIZE = 500
+
+# Number of replies removed per MongoDB and Redis call when deleting a post
+REPLY_BATCH_SIZE = 500
+
 
 class CantVoteOnOwn(Exception):
     """Raised when a user tries to vote on a post they authored
@@ -72,6 +79,15 @@ class PostingAlert(BaseAlert):
         super(PostingAlert, self).__init__(user_id)
         self.post_id = post_id
 
+    @cached_property
+    def post(self):
+        """Helper; Get the post the alert is about, only the `username` of its
+        author is loaded. `AlertManager.get_many()` fills this in for a whole
+        page of alerts at once.
+
+        """
+        return m.db.posts.find_one({'_id': self.post_id}, {'username': True})
+
     def url(self):
         """Get the user object or the original author for the post.
 
@@ -79,20 +95,15 @@ class PostingAlert(BaseAlert):
             post. This is needed to generate the URL.
 
         """
-        # Get the author of the posts username so that we can build the URL
-        author = m.db.posts.find_one({'_id': self.post_id},
-                                     {'username': True, '_id': False})
-
-        # Return the username or None
-        return url_for('posts.view_post', username=author.get('username'),
+        # The author of the post's username is needed to build the URL
+        return url_for('posts.view_post', username=self.post.get('username'),
                        post_id=self.post_id)
 
     def verify(self):
         """Overwrites the verify() of BaseAlert to check the post exists
 
         """
-        return m.db.users.find_one({'_id': self.user_id}, {}) and \
-            m.db.posts.find_one({'_id': self.post_id}, {})
+        return self.user is not None and self.post is not None
 
 
 class TaggingAlert(PostingAlert):
@@ -217,13 +228,17 @@ def create_post(user_id, username, body, reply_to=None, upload=None,
     # Only carry out the rest of the actions if the insert was successful
     if result:
         if reply_to is None:
+            # These writes do not depend on each other so send them to Redis
+            # in one go
+            pipe = r.pipeline(transaction=False)
             # Add post to authors feed
-            r.zadd(k.USER_FEED.format(user_id), {str(post_id): post_time})
+            pipe.zadd(k.USER_FEED.format(user_id), {str(post_id): post_time})
             # Ensure the feed does not grow to large
-            r.zremrangebyrank(k.USER_FEED.format(user_id), 0, -1000)
-
+            pipe.zremrangebyrank(k.USER_FEED.format(user_id), 0, -1000)
             # Subscribe the poster to there post
-            subscribe(user_id, post_id, SubscriptionReasons.POSTER)
+            subscribe(user_id, post_id, SubscriptionReasons.POSTER, pipe=pipe,
+                      check_exists=False)
+            pipe.execute()
 
             # Alert everyone tagged in the post
             alert_tagees(mentions, user_id, post_id)
@@ -247,19 +262,17 @@ def create_post(user_id, username, body, reply_to=None, upload=None,
             # added. We do this before subscribing anyone new
             alert = CommentingAlert(user_id, reply_to)
 
-            subscribers = []
-            # Iterate through subscribers and let them know about the comment
-            for subscriber_id in get_subscribers(reply_to):
-                # Ensure we don't get alerted for our own comments
-                if subscriber_id != user_id:
-                    subscribers.append(subscriber_id)
+            # Ensure we don't get alerted for our own comments
+            subscribers = get_subscribers(reply_to, exclude=user_id)
 
             # Push the comment alert out to all subscribers
             AlertManager().alert(alert, subscribers)
 
             # Subscribe the user to the post, will not change anything if they
-            # are already subscribed
-            subscribe(user_id, reply_to, SubscriptionReasons.COMMENTER)
+            # are already subscribed. We know reply_to exists so there is no
+            # need for subscribe() to check MongoDB first
+            subscribe(user_id, reply_to, SubscriptionReasons.COMMENTER,
+                      check_exists=False)
 
             # Alert everyone tagged in the post
             alert_tagees(mentions, user_id, reply_to)
@@ -277,29 +290,39 @@ def populate_followers_feeds(user_id, post_id, timestamp):
     This can be run on a worker to speed the process up.
 
     """
-    # Get a list of ALL users who are following a user
-    followers = r.zrange(k.USER_FOLLOWERS.format(user_id), 0, -1)
-    # This is not transactional as to not hold Redis up.
-    for follower_id in followers:
-        # Add the pid to the list
-        r.zadd(k.USER_FEED.format(follower_id), {str(post_id): timestamp})
-        # Stop followers feeds from growing to large, doesn't matter if it
-        # doesn't exist
-        r.zremrangebyrank(k.USER_FEED.format(follower_id), 0, -1000)
+    populate_feeds(k.USER_FOLLOWERS.format(user_id), post_id, timestamp)
 
 
 @celery.task()
 def populate_approved_followers_feeds(user_id, post_id, timestamp):
     """Fan out a post_id to all the users approved followers."""
+    populate_feeds(k.USER_APPROVED.format(user_id), post_id, timestamp)
+
+
+def populate_feeds(followers_key, post_id, timestamp):
+    """Add `post_id` to the feed of every user in the `followers_key` zset.
+
+    The feed writes happen inside Redis (see `pjuu.lib.lua.POPULATE_FEEDS`),
+    one script call per `FEED_BATCH_SIZE` followers. This saves sending two
+    commands per follower but does not hold Redis up for the whole fan out.
+
+    :param followers_key: Redis key of the zset holding the follower ids
+    :type followers_key: str
+    :param post_id: The post to place in each feed
+    :type post_id: str
+    :param timestamp: The score (creation time) of the post
+    :type timestamp: float
+
+    """
     # Get a list of ALL users who are following a user
-    followers = r.zrange(k.USER_APPROVED.format(user_id), 0, -1)
-    # This is not transactional as to not hold Redis up.
-    for follower_id in followers:
-        # Add the pid to the list
-        r.zadd(k.USER_FEED.format(follower_id), {str(post_id): timestamp})
-        # Stop followers feeds from growing to large, doesn't matter if it
-        # doesn't exist
-        r.zremrangebyrank(k.USER_FEED.format(follower_id), 0, -1000)
+    followers = r.zrange(followers_key, 0, -1)
+
+    fan_out = r.register_script(lua.POPULATE_FEEDS)
+
+    for i in range(0, len(followers), FEED_BATCH_SIZE):
+        feeds = [k.USER_FEED.format(follower_id)
+                 for follower_id in followers[i:i + FEED_BATCH_SIZE]]
+        fan_out(keys=feeds, args=[str(post_id), timestamp])
 
 
 def alert_tagees(tagees, user_id, post_id):
@@ -309,6 +332,9 @@ def alert_tagees(tagees, user_id, post_id):
     This will take the tagees processed as `mentions`, it will ensure no
     duplication and that the poster is not alerted if they tag themselves.
 
+    `post_id` has to exist, this is called straight after the post (or the
+    reply to it) has been stored.
+
     :type tagees: list
     :type user_id: str
     :type post_id: str
@@ -316,7 +342,10 @@ def alert_tagees(tagees, user_id, post_id):
     """
     alert = TaggingAlert(user_id, post_id)
 
-    seen_user_ids = []
+    # Subscriptions are queued and sent to Redis at once after the loop
+    pipe = r.pipeline(transaction=False)
+
+    seen_user_ids = set()
     for tagee in tagees:
         tagged_user_id = tagee.get('user_id')
 
@@ -330,9 +359,12 @@ def alert_tagees(tagees, user_id, post_id):
 
         # Subscribe the tagee to the post won't change anything if they are
         # already subscribed
-        subscribe(tagged_user_id, post_id, SubscriptionReasons.TAGEE)
+        subscribe(tagged_user_id, post_id, SubscriptionReasons.TAGEE,
+                  pipe=pipe, check_exists=False)
+
+        seen_user_ids.add(tagged_user_id)
 
-        seen_user_ids.append(tagged_user_id)
+    pipe.execute()
 
     # Get an alert manager to notify all tagees
     AlertManager().alert(alert, seen_user_ids)
@@ -362,14 +394,17 @@ def back_feed(who_id, whom_id):
         {'_id': True, 'created': True},
     ).sort('created', -1).limit(5)
 
-    # Iterate the cursor and append the posts to the users feed
-    for post in posts:
-        timestamp = post.get('created')
-        post_id = post.get('_id')
-        # Place on the feed
-        r.zadd(k.USER_FEED.format(who_id), {str(post_id): timestamp})
+    feed = dict((str(post.get('_id')), post.get('created'))
+                for post in posts)
+
+    if feed:
+        # Nothing here needs to be atomic so don't wrap it in MULTI/EXEC
+        pipe = r.pipeline(transaction=False)
+        # Place all the posts on the feed at once
+        pipe.zadd(k.USER_FEED.format(who_id), feed)
         # Trim the feed to the 1000 max
-        r.zremrangebyrank(k.USER_FEED.format(who_id), 0, -1000)
+        pipe.zremrangebyrank(k.USER_FEED.format(who_id), 0, -1000)
+        pipe.execute()
 
 
 def check_post(user_id, post_id, reply_id=None):
@@ -381,39 +416,87 @@ def check_post(user_id, post_id, reply_id=None):
               This for checking the urls not for checking who wrote reply_id
 
     """
-    # Check if cid is a comment of post pid
+    # Fetch the post and the reply (if there is one) in a single query
+    post_ids = [post_id, reply_id] if reply_id else [post_id]
+    cursor = m.db.posts.find({'_id': {'$in': post_ids}},
+                             {'user_id': True, 'reply_to': True})
+    posts = dict((post.get('_id'), post) for post in cursor)
+
+    # Check if reply_id is a reply to post_id
     if reply_id:
-        # Get the reply_to field of the reply object and check it matches
-        reply = m.db.posts.find_one({'_id': reply_id}, {'reply_to': True})
-        if reply:
-            if reply.get('reply_to') != post_id:
-                return False
-        else:
+        reply = posts.get(reply_id)
+        if reply is None or reply.get('reply_to') != post_id:
             return False
 
-    # Get the user_id for post with post_id to verify
-    post = m.db.posts.find_one({'_id': post_id}, {'user_id': True})
-    if post is not None and post.get('user_id') == user_id:
-        return True
-
-    return False
+    # Verify user_id created post_id
+    post = posts.get(post_id)
+    return post is not None and post.get('user_id') == user_id
 
 
-def get_post(post_id):
+def get_post(post_id, fields=None):
     """Returns a post. Simple helper function
 
+    The authors avatar and donated flag are joined on to the post inside
+    MongoDB so only one round trip is needed.
+
+    If `fields` is passed only those fields of the post are returned and the
+    author is not joined on. Use it when the post isn't going to be shown.
+
     """
-    post = m.db.posts.find_one({'_id': post_id})
-    # Attach in the e-mail (will be removed with image uploads)
+    if fields is not None:
+        return m.db.posts.find_one({'_id': post_id}, fields)
+
+    cursor = m.db.posts.aggregate([
+        {'$match': {'_id': post_id}},
+        {'$limit': 1},
+        {'$lookup': {
+            'from': 'users',
+            'localField': 'user_id',
+            'foreignField': '_id',
+            'as': 'author'
+        }},
+        # Only keep the fields we need from the author
+        {'$addFields': {
+            'user_avatar': {'$arrayElemAt': ['$author.avatar', 0]},
+            'user_donated': {
+                '$ifNull': [{'$arrayElemAt': ['$author.donated', 0]}, False]
+            }
+        }},
+        {'$project': {'author': False}}
+    ])
+
+    return next(cursor, None)
+
+
+def attach_authors(posts):
+    """Adds the authors avatar and donated flag to each post in `posts`.
+
+    All of the authors are looked up in one `$in` query rather than one query
+    per post. Posts whose author no longer exists are left out.
+
+    :param posts: Post dicts as returned from MongoDB
+    :type posts: list
+    :returns: The posts which have an author
+    :rtype: list
+
+    """
+    # Get a list of unique `user_id`s from all the post.
+    user_ids = list(set([post.get('user_id') for post in posts]))
+    cursor = m.db.users.find({'_id': {'$in': user_ids}},
+                             {'avatar': True, 'donated': True})
+
+    users = dict((user.get('_id'), user) for user in cursor)
+
+    processed_posts = []
+    for post in posts:
+        user = users.get(post.get('user_id'))
 
-    if post is not None:
-        user = m.db.users.find_one({'_id': post.get('user_id')},
-                                   {'avatar': True, 'donated': True})
         if user is not None:
             post['user_avatar'] = user.get('avatar')
             post['user_donated'] = user.get('donated', False)
+            processed_posts.append(post)
 
-    return post
+    return processed_posts
 
 
 def get_global_feed(page=1, per_page=None, perm=0):
@@ -425,37 +508,30 @@ def get_global_feed(page=1, per_page=None, perm=0):
         'permission': {'$lte': perm}
     }
 
-    total = m.db.posts.find(lookup_dict).count()
+    # Counting every post on the site is expensive. Fetch one extra post
+    # instead to find out if there is another page.
     cursor = m.db.posts.find(lookup_dict).sort(
-        'created', -1).skip((page - 1) * per_page).limit(per_page)
+        'created', -1).skip((page - 1) * per_page).limit(per_page + 1)
 
-    posts = []
-    for post in cursor:
-        posts.append(post)
+    posts = list(cursor)
+    has_next = len(posts) > per_page
 
-    # Get a list of unique `user_id`s from all the post.
-    user_ids = list(set([post.get('user_id') for post in posts]))
-    cursor = m.db.users.find({'_id': {'$in': user_ids}},
-                             {'avatar': True, 'donated': True})
-    # Create a lookup dict `{username: email}`
-    users = \
-        dict((user.get('_id'), {
-            'avatar': user.get('avatar'),
-            'donated': user.get('donated', False)
-        }) for user in cursor)
-
-    # Add the e-mails to the posts
-    processed_posts = []
-    for post in posts:
-        post['user_avatar'] = users.get(post.get('user_id')).get('avatar')
-        post['user_donated'] = users.get(post.get('user_id')).get('donated')
-        processed_posts.append(post)
+    posts = attach_authors(posts[:per_page])
+
+    return Pagination(posts, None, page, per_page, has_next=has_next)
 
-    return Pagination(posts, total, page, per_page)
 
+def get_posts(user_id, page=1, per_page=None, perm=0, before=None,
+              before_id=None):
+    """Returns a users posts as a pagination object.
 
-def get_posts(user_id, page=1, per_page=None, perm=0):
-    """Returns a users posts as a pagination object."""
+    If `before` (the `created` time of the last post on the previous page) is
+    given, the page starts from there rather than MongoDB skipping over all
+    of the previous pages. `before_id` (the `_id` of that post) makes sure
+    posts created at the same time as it aren't missed. These pages are not
+    counted, `has_next` says if there is another page.
+
+    """
     if per_page is None:
         per_page = app.config.get('FEED_ITEMS_PER_PAGE')
 
@@ -470,17 +546,44 @@ def get_posts(user_id, page=1, per_page=None, perm=0):
 
     lookup_dict['permission'] = {'$lte': perm}
 
-    total = m.db.posts.find(lookup_dict).count()
-    cursor = m.db.posts.find(lookup_dict).sort(
-        'created', -1).skip((page - 1) * per_page).limit(per_page)
+    # Sort on `_id` as well so the order is the same whichever way the page
+    # is found
+    sort = [('created', -1), ('_id', -1)]
+
+    if before is not None:
+        if before_id is not None:
+            lookup_dict['$or'] = [
+                {'created': {'$lt': before}},
+                {'created': before, '_id': {'$lt': before_id}}
+            ]
+        else:
+            lookup_dict['created'] = {'$lt': before}
+
+        # Counting every post would scan them all, which is what this is
+        # avoiding. Fetch one extra post to see if there is another page.
+        total = None
+        posts = list(m.db.posts.find(lookup_dict).sort(sort).limit(
+            per_page + 1))
+        has_next = len(posts) > per_page
+        posts = posts[:per_page]
+    else:
+        total = m.db.posts.find(lookup_dict).count()
+        has_next = False
+        posts = list(m.db.posts.find(lookup_dict).sort(sort).skip(
+            (page - 1) * per_page).limit(per_page))
 
-    posts = []
-    for post in cursor:
+    for post in posts:
         post['user_avatar'] = user.get('avatar')
         post['user_donated'] = user.get('donated', False)
-        posts.append(post)
 
-    return Pagination(posts, total, page, per_page)
+    if posts:
+        next_before = posts[-1].get('created')
+        next_before_id = posts[-1].get('_id')
+    else:
+        next_before = next_before_id = None
+
+    return Pagination(posts, total, page, per_page, next_before,
+                      next_before_id, has_next=has_next)
 
 
 def get_replies(post_id, page=1, per_page=None, sort_order=-1):
@@ -495,17 +598,8 @@ def get_replies(post_id, page=1, per_page=None, sort_order=-1):
         [('created', sort_order)]
     ).skip((page - 1) * per_page).limit(per_page)
 
-    replies = []
-    for reply in cursor:
-        # We have to get the users email for each post for the gravatar
-        user = m.db.users.find_one(
-            {'_id': reply.get('user_id')},
-            {'avatar': True, 'donated': True})
-
-        if user is not None:  # pragma: no branch
-            reply['user_avatar'] = user.get('avatar')
-            reply['user_donated'] = user.get('donated', False)
-            replies.append(reply)
+    # Get the authors of all the replies at once
+    replies = attach_authors(list(cursor))
 
     return Pagination(replies, total, page, per_page)
 
@@ -523,15 +617,7 @@ def get_hashtagged_posts(hashtag, page=1, per_page=None):
         'reply_to': {'$exists': False}
     }).sort('created', -1).skip((page - 1) * per_page).limit(per_page)
 
-    posts = []
-    for post in cursor:
-        user = m.db.users.find_one(
-            {'_id': post.get('user_id')},
-            {'avatar': True})
-
-        if post is not None:  # pragma: no branch
-            post['user_avatar'] = user.get('avatar')
-            posts.append(post)
+    posts = attach_authors(list(cursor))
 
     return Pagination(posts, total, page, per_page)
 
@@ -543,7 +629,21 @@ def has_voted(user_id, post_id):
     return r.zscore(k.POST_VOTES.format(post_id), user_id)
 
 
-def vote_post(user_id, post_id, amount=1, ts=None):
+def get_votes(user_id, post_ids):
+    """Returns `user_id`s vote on each post in `post_ids` as a dict. Posts
+    which haven't been voted on map to `None`.
+
+    All of the look ups are sent to Redis in one pipeline.
+
+    """
+    pipe = r.pipeline(transaction=False)
+    for post_id in post_ids:
+        pipe.zscore(k.POST_VOTES.format(post_id), user_id)
+
+    return dict(zip(post_ids, pipe.execute()))
+
+
+def vote_post(user_id, post_id, amount=1, ts=None, author_uid=None):
     """Handles voting on posts
 
     :param user_id: User who is voting
@@ -554,87 +654,57 @@ def vote_post(user_id, post_id, amount=1, ts=None):
     :type amount: int
     :param ts: Timestamp to use for vote (ONLY FOR TESTING)
     :type ts: int
+    :param author_uid: The user who wrote the post, if the caller already
+                       knows it. Saves looking the post up.
+    :type author_uid: str
     :returns: -1 if downvote, 0 if reverse vote and +1 if upvote
 
     """
     if ts is None:
         ts = timestamp()
 
-    # Get the comment so we can check who the author is
-    author_uid = get_post(post_id).get('user_id')
+    if author_uid is None:
+        # Get the post so we can check who the author is
+        post = m.db.posts.find_one({'_id': post_id}, {'user_id': True})
+        author_uid = post.get('user_id')
+
+    if author_uid == user_id:
+        raise CantVoteOnOwn
 
     # Votes can ONLY ever be -1 or 1 and nothing else
     # we use the sign to store the time and score in one zset score
     amount = 1 if amount >= 0 else -1
 
-    voted = has_voted(user_id, post_id)
-
-    if not voted:
-        if author_uid != user_id:
-            # Store the timestamp of the vote with the sign of the vote
-            r.zadd(k.POST_VOTES.format(post_id), {
-                str(user_id): amount * timestamp()
-            })
-
-            # Update post score
-            m.db.posts.update({'_id': post_id},
-                              {'$inc': {'score': amount}})
-
-            # Update user score
-            m.db.users.update({'_id': author_uid},
-                              {'$inc': {'score': amount}})
+    # Checking for a previous vote and recording the new one happens inside
+    # Redis so two votes at the same time can't both be counted
+    vote = r.register_script(lua.VOTE_POST)
+    result = vote(keys=[k.POST_VOTES.format(post_id)],
+                  args=[str(user_id), amount, ts, amount * timestamp(),
+                        k.VOTE_TIMEOUT])
 
-            return amount
-        else:
-            raise CantVoteOnOwn
-    elif voted and abs(voted) + k.VOTE_TIMEOUT > ts:
-        # No need to check if user is current user because it can't
-        # happen in the first place
-        # Remove the vote from Redis
-        r.zrem(k.POST_VOTES.format(post_id), user_id)
-
-        previous_vote = -1 if voted < 0 else 1
-
-        # Calculate how much to increment/decrement the scores by
-        # Saves multiple trips to Mongo
-        if amount == previous_vote:
-            if previous_vote < 0:
-                amount = 1
-                result = 0
-            else:
-                amount = -1
-                result = 0
-        else:
-            # We will only register the new vote if it is NOT a vote reversal.
-            r.zadd(k.POST_VOTES.format(post_id), {
-                str(user_id): amount * timestamp()
-            })
+    if result is None:
+        raise AlreadyVoted
 
-            if previous_vote < 0:
-                amount = 2
-                result = 1
-            else:
-                amount = -2
-                result = -1
+    increment, result = result
 
-        # Update post score
-        m.db.posts.update({'_id': post_id},
-                          {'$inc': {'score': amount}})
+    # Update post score
+    m.db.posts.update({'_id': post_id},
+                      {'$inc': {'score': increment}})
 
-        # Update user score
-        m.db.users.update({'_id': author_uid},
-                          {'$inc': {'score': amount}})
+    # Update user score
+    m.db.users.update({'_id': author_uid},
+                      {'$inc': {'score': increment}})
 
-        return result
-    else:
-        raise AlreadyVoted
+    return result
 
 
 def delete_post(post_id):
     """Deletes a post
 
     """
-    post = get_post(post_id)
+    # Only the fields needed to clean up after the post are loaded
+    post = m.db.posts.find_one({'_id': post_id},
+                               {'upload': True, 'reply_to': True})
 
     # In some situations a post may be in a cursor (deleting account) but have
     # already been deleted by this function in a previous run.
@@ -658,42 +728,61 @@ def delete_post(post_id):
             delete_post_replies(post_id)
 
 
+def _delete_replies(reply_ids):
+    """Removes the replies in `reply_ids` and their votes."""
+    # Delete the comments themselves from MongoDB
+    m.db.posts.remove({'_id': {'$in': reply_ids}})
+
+    # Delete votes from Redis
+    r.delete(*[k.POST_VOTES.format(reply_id) for reply_id in reply_ids])
+
+
 def delete_post_replies(post_id):
     """Delete ALL comments on post with pid.
 
-    This can't be done in one single call to Mongo because we need to remove
-    the votes from Redis!
+    The replies are removed `REPLY_BATCH_SIZE` at a time, one MongoDB call
+    and one Redis call per batch. Uploads have to be deleted one by one.
 
     """
     # Get a cursor for all the posts comments
-    cur = m.db.posts.find({'reply_to': post_id})
+    cur = m.db.posts.find({'reply_to': post_id}, {'upload': True})
 
-    # Iterate over the cursor and delete each one
+    reply_ids = []
     for reply in cur:
-        reply_id = reply.get('_id')
-
-        # Delete the comment itself from MongoDB
-        m.db.posts.remove({'_id': reply_id})
+        reply_ids.append(reply.get('_id'))
 
         # Remove any uploaded files
         if 'upload' in reply:
             storage.delete(reply['upload'])
 
-        # Delete votes from Redis
-        r.delete(k.POST_VOTES.format(reply_id))
+        if len(reply_ids) >= REPLY_BATCH_SIZE:
+            _delete_replies(reply_ids)
+            reply_ids = []
+
+    if reply_ids:
+        _delete_replies(reply_ids)
 
 
-def subscribe(user_id, post_id, reason):
+def subscribe(user_id, post_id, reason, pipe=None, check_exists=True):
     """Subscribes a user (uid) to post (pid) for reason.
 
+    If a Redis pipeline is passed as `pipe` the subscription is only queued
+    on it and the pipeline is returned.
+
+    Pass `check_exists=False` to skip checking MongoDB for the post, only do
+    this when the caller knows the post exists, e.g. it has just created it.
+
     """
     # Check that pid exsits if not do nothing
-    if not m.db.posts.find_one({'_id': post_id}, {}):
+    if check_exists and not m.db.posts.find_one({'_id': post_id}, {}):
         return False
 
+    if pipe is None:
+        pipe = r
+
     # Only subscribe the user if the user is not already subscribed
     # this will mean the original reason is kept
-    return r.zadd(k.POST_SUBSCRIBERS.format(post_id), {
+    return pipe.zadd(k.POST_SUBSCRIBERS.format(post_id), {
         str(user_id): reason
     }, nx=True)
 
@@ -737,23 +826,32 @@ def unflag_post(post_id):
     return m.db.posts.update({'_id': post_id}, {'$set': {'flags': 0}})
 
 
-def get_subscribers(post_id):
+def get_subscribers(post_id, exclude=None):
     """Return a list of subscribers 'user_id's for a given post
 
+    :param exclude: A user_id to leave out of the list (e.g. the commenter)
+    :type exclude: str or None
+
     """
-    return r.zrange(k.POST_SUBSCRIBERS.format(post_id), 0, -1)
+    subscribers = r.zrange(k.POST_SUBSCRIBERS.format(post_id), 0, -1)
+
+    if exclude is not None:
+        subscribers = [user_id for user_id in subscribers
+                       if user_id != exclude]
+
+    return subscribers
 
 
 def is_subscribed(user_id, post_id):
     """Returns a boolean to denote if a user is subscribed or not
 
     """
-    return r.zrank(k.POST_SUBSCRIBERS.format(post_id), user_id) is not None
+    return r.zscore(k.POST_SUBSCRIBERS.format(post_id), user_id) is not None
 
 
 def has_flagged(user_id, post_id):
     """"""
-    return r.zrank(k.POST_FLAGS.format(post_id), user_id) is not None
+    return r.zscore(k.POST_FLAGS.format(post_id), user_id) is not None
 
 
 def subscription_reason(user_id, post_id):
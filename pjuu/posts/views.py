@@ -8,8 +8,9 @@
 """
 
 import mimetypes
-from flask import (abort, flash, redirect, request, url_for, render_template,
-                   Blueprint, current_app as app, jsonify, send_file)
+from flask import (abort, flash, g, redirect, request, url_for,
+                   render_template, Blueprint, current_app as app, jsonify,
+                   send_file)
 from jinja2 import escape
 
 from pjuu import storage
@@ -22,9 +23,10 @@ from .backend import (create_post, check_post, has_voted, is_subscribed,
                       get_replies, unsubscribe as be_unsubscribe,
                       CantVoteOnOwn, AlreadyVoted, get_hashtagged_posts,
                       flag_post, has_flagged, CantFlagOwn, AlreadyFlagged,
-                      unflag_post as be_unflag_post, get_global_feed)
+                      unflag_post as be_unflag_post, get_global_feed,
+                      get_votes)
 from .forms import PostForm
-from pjuu.auth.utils import get_user, get_uid
+from pjuu.auth.utils import get_uid
 from pjuu.users.backend import get_user_permission
 
 
@@ -46,20 +48,27 @@ def postify_filter(post, limit_lines=False):
              you will need to use 'item|postify' and ensure autoescape is off.
 
     """
-    post_body = post.get('body')
+    body = post.get('body')
 
     items = post.get('links', []) + post.get('mentions', []) + \
         post.get('hashtags', [])
 
     items = sorted(items, key=lambda k: k['span'][0])
 
-    offset = 0
+    # The spans were stored when the post was created so the body never needs
+    # parsing again. Build the output in pieces rather than re-slicing the
+    # whole body for every item.
+    parts = []
+    last = 0
     for item in items:
-        left = item['span'][0] + offset
-        right = item['span'][1] + offset
+        left, right = item['span'][0], item['span'][1]
+
+        # Never link the same text twice, e.g. a #hashtag inside a link
+        if left < last:
+            continue
 
         # The snippet of text we need to replace
-        replace_text = post_body[left:right]
+        replace_text = body[left:right]
 
         if 'link' in item:
             html = '<a href="{0}" target="_blank">{1}</a>'.format(
@@ -85,8 +94,12 @@ def postify_filter(post, limit_lines=False):
             # match any of the above.
             continue  # pragma: no cover
 
-        offset += len(html) - (item['span'][1] - item['span'][0])
-        post_body = post_body[:left] + html + post_body[right:]
+        parts.append(body[last:left])
+        parts.append(html)
+        last = right
+
+    parts.append(body[last:])
+    post_body = ''.join(parts)
 
     if limit_lines:
         post_body = '\n'.join(post_body.splitlines()[:5])
@@ -97,6 +110,22 @@ def postify_filter(post, limit_lines=False):
     return post_body
 
 
+@posts_bp.app_template_global('preload_votes')
+def preload_votes(items):
+    """Looks up the current users votes on all the posts in `items` at once
+    so the `voted` filter doesn't need to go to Redis for each one.
+
+    Lists use this before rendering their items:
+        {% set _ = preload_votes(pagination.items) %}
+
+    """
+    if current_user:
+        post_ids = [item.get('_id') for item in items
+                    if isinstance(item, dict) and 'user_id' in item]
+        g.votes = get_votes(current_user.get('_id'), post_ids)
+    return ''
+
+
 @posts_bp.app_template_filter('voted')
 def voted_filter(post_id):
     """Checks to see if current_user has voted on the post pid.
@@ -110,6 +139,9 @@ def voted_filter(post_id):
 
     """
     if current_user:
+        votes = g.get('votes', {})
+        if post_id in votes:
+            return votes[post_id] or 0
         return has_voted(current_user.get('_id'), post_id) or 0
     return False
 
@@ -148,25 +180,24 @@ def view_post(username, post_id):
 
     .. note: Viewable to the public if the post is public!
     """
-    if not check_post(get_uid(username), post_id):
-        return abort(404)
+    user_id = get_uid(username)
 
-    # Get post and comments for the current page
+    # Get post and comments for the current page. The post already carries
+    # its `user_id` so there is no need to check_post() or load the user.
     _post = get_post(post_id)
 
-    # Stop a reply from ever being shown here
-    if 'reply_to' in _post:
+    # The post has to belong to `username` and a reply is never shown here
+    if _post is None or _post.get('user_id') != user_id or \
+            'reply_to' in _post:
         return abort(404)
 
-    _user = get_user(get_uid(username))
-
     # Only get the permission if the post is not owned by the current user
     if current_user:
         current_user_id = current_user.get('_id')
     else:
         current_user_id = None
 
-    permission = get_user_permission(_user.get('_id'), current_user_id)
+    permission = get_user_permission(user_id, current_user_id)
 
     if permission < _post.get('permission', k.PERM_PUBLIC):
         return abort(403)
@@ -227,7 +258,8 @@ def post(username=None, post_id=None):
         if not check_post(get_uid(username), post_id):
             return abort(404)
 
-        _post = get_post(post_id)
+        _post = get_post(post_id, fields={'user_id': True,
+                                          'permission': True})
 
         # Ensuer user has permission to perform the action
         current_user_id = current_user.get('_id')
@@ -324,7 +356,7 @@ def vote(username, post_id, reply_id=None):
 
         return abort(404)
 
-    _post = get_post(post_id)
+    _post = get_post(post_id, fields={'user_id': True, 'permission': True})
 
     # Ensuer user has permission to perform the action
     current_user_id = current_user.get('_id')
@@ -350,7 +382,8 @@ def vote(username, post_id, reply_id=None):
 
     try:
         if reply_id is None:
-            result = vote_post(current_user['_id'], post_id, amount=amount)
+            result = vote_post(current_user['_id'], post_id, amount=amount,
+                               author_uid=_post.get('user_id'))
         else:
             result = vote_post(current_user['_id'], reply_id, amount=amount)
     except AlreadyVoted:
@@ -402,14 +435,10 @@ def delete_post(username, post_id, reply_id=None):
     if not check_post(user_id, post_id, reply_id):
         return abort(404)
 
-    if reply_id is not None:
-        _post = get_post(reply_id)
-
-        if _post['user_id'] != current_user['_id'] and \
-                user_id != current_user['_id']:
-            return abort(403)
-    else:
-        if user_id != current_user['_id']:
+    # A reply can be deleted by its author or the author of the post it is on.
+    # Only look at who wrote the reply if the current user doesn't own the post
+    if user_id != current_user['_id']:
+        if reply_id is None or not check_post(current_user['_id'], reply_id):
             return abort(403)
 
     if reply_id is not None:
@@ -453,16 +482,17 @@ def flag(username, post_id):
     if not check_post(get_uid(username), post_id):
         return abort(404)
 
-    _post = get_post(post_id)
+    _post = get_post(post_id, fields={'user_id': True, 'permission': True,
+                                      'reply_to': True})
 
     # Ensure the default redirect is to the correct location.
-    reply_id = get_post(post_id).get('reply_to')
+    reply_id = _post.get('reply_to')
 
     if reply_id is None:
         redirect_url = handle_next(request, url_for('posts.view_post',
                                    username=username, post_id=post_id))
     else:
-        reply = get_post(reply_id)
+        reply = get_post(reply_id, fields={'username': True})
         redirect_url = handle_next(request, url_for('posts.view_post',
                                    username=reply.get('username'),
                                    post_id=reply_id))
@@ -499,7 +529,7 @@ def unflag_post(post_id):
     if not current_user or not current_user.get('op', False):
         return abort(403)
 
-    if get_post(post_id) is None:
+    if get_post(post_id, fields={}) is None:
         return abort(404)
 
     # Reset the posts flag. Doesn't matter if there aren't any
@@ -72,6 +72,12 @@ MAIL_USERNAME = env.str('MAIL_USERNAME', None)
 MAIL_PASSWORD = env.str('MAIL_PASSWORD', None)
 MAIL_DEFAULT_SENDER = 'Pjuu <noreply@pjuu.com>'
 
+# Passwords
+# The method and salt length Werkzeug uses to hash passwords. Only weaken
+# these for testing, existing hashes keep working if they are changed.
+PASSWORD_HASH_METHOD = env.str('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+PASSWORD_SALT_LENGTH = env.int('PASSWORD_SALT_LENGTH', 20)
+
 # Flask-WTF (Cross site request forgery)
 # CSRF should be off during testing to allow us to submit forms
 WTF_CSRF_ENABLED = True
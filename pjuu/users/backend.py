@@ -8,6 +8,7 @@ Redis and MongoDB.
 
 """
 
+import json
 import re
 
 from flask import current_app as app, url_for
@@ -20,13 +21,20 @@ from pjuu.lib import keys as k, timestamp, fix_url
 from pjuu.lib.alerts import BaseAlert, AlertManager
 from pjuu.lib.pagination import Pagination
 from pjuu.lib.uploads import process_upload
-from pjuu.posts.backend import back_feed
+from pjuu.posts.backend import attach_authors, back_feed
 
 
 # Regular expressions
 SEARCH_PATTERN = r'[^\w]'
 SEARCH_RE = re.compile(SEARCH_PATTERN)
 
+# The only user fields needed to render a user in a list (see list_user.html)
+# The e-mail is used to tell users apart from posts in list.html
+USER_LIST_FIELDS = {
+    'username': True, 'email': True, 'avatar': True, 'donated': True,
+    'about': True, 'created': True
+}
+
 
 class FollowAlert(BaseAlert):
     """A simple class for a following alert."""
@@ -91,28 +99,11 @@ def get_feed(user_id, page=1, per_page=None):
                        (page * per_page) - 1)
 
     # Get all the posts in one call to MongoDB
-    posts = []
     cursor = m.db.posts.find({'_id': {'$in': pids}}).sort(
         'created', pymongo.DESCENDING)
 
-    for post in cursor:
-        posts.append(post)
-
-    # Get a list of unique `user_id`s from all the post.
-    user_ids = list(set([post.get('user_id') for post in posts]))
-    cursor = m.db.users.find({'_id': {'$in': user_ids}},
-                             {'avatar': True, 'donated': True})
-
-    users = dict((user.get('_id'), {
-        'avatar': user.get('avatar'),
-        'donated': user.get('donated', False)
-    }) for user in cursor)
-
-    processed_posts = []
-    for post in posts:
-        post['user_avatar'] = users.get(post.get('user_id')).get('avatar')
-        post['user_donated'] = users.get(post.get('user_id')).get('donated')
-        processed_posts.append(post)
+    # And all of their authors in another
+    processed_posts = attach_authors(list(cursor))
 
     # Clean up the list in Redis if the
     if len(processed_posts) < len(pids):
@@ -131,12 +122,23 @@ def remove_from_feed(post_id, user_id):
 def top_users_by_score(limit=5):
     """Get the top 5 users by score.
     Used to show names on the welcome message.
+
+    The list is rendered on every feed load for new users but changes slowly,
+    so it is cached in Redis for `TOP_USERS_TIMEOUT` seconds.
     """
+    cached = r.get(k.TOP_USERS.format(limit))
+    if cached is not None:
+        return json.loads(cached)
+
     cursor = m.db.users.find(
         {}, {'_id': -1, 'username': 1}).sort('score', -1).limit(limit)
     users = []
     for user in cursor:
         users.append(user)
+
+    r.setex(k.TOP_USERS.format(limit), k.TOP_USERS_TIMEOUT,
+            json.dumps(users))
+
     return users
 
 
@@ -145,7 +147,7 @@ def follow_user(who_uid, whom_uid):
     Generate an alert for this action.
     """
     # Check that we are not already following the user
-    if r.zrank(k.USER_FOLLOWING.format(who_uid), str(whom_uid)) is not None:
+    if r.zscore(k.USER_FOLLOWING.format(who_uid), str(whom_uid)) is not None:
         return False
 
     # Follow user
@@ -167,7 +169,7 @@ def unfollow_user(who_uid, whom_uid):
     """Remove whom from who's following zset and who to whom's followers zset.
     """
     # Check that we are actually following the users
-    if r.zrank(k.USER_FOLLOWING.format(who_uid), whom_uid) is None:
+    if r.zscore(k.USER_FOLLOWING.format(who_uid), whom_uid) is None:
         return False
 
     # Delete uid from who following and whom followers
@@ -184,7 +186,7 @@ def approve_user(who_uid, whom_uid):
     """Allow a user to approve a follower"""
     # Check that the user is actually following.
     # Fail if not
-    if r.zrank(k.USER_FOLLOWERS.format(who_uid), whom_uid) is None:
+    if r.zscore(k.USER_FOLLOWERS.format(who_uid), whom_uid) is None:
         return False
 
     # Add the user to the approved list
@@ -197,7 +199,7 @@ def approve_user(who_uid, whom_uid):
 def unapprove_user(who_uid, whom_uid):
     """Allow a user to un-approve a follower"""
     # Check the follower is actually approved
-    if r.zrank(k.USER_APPROVED.format(who_uid), whom_uid) is None:
+    if r.zscore(k.USER_APPROVED.format(who_uid), whom_uid) is None:
         return False
 
     # No alert for un-approved
@@ -206,89 +208,100 @@ def unapprove_user(who_uid, whom_uid):
     return True
 
 
-def get_following(uid, page=1, per_page=None):
-    """Returns a list of users uid is following as a pagination object."""
+def _get_users_page(key, page, per_page):
+    """Returns a page of the users in the sorted set `key` (newest first) as a
+    pagination object.
+
+    All of the users on the page are fetched from MongoDB in one query. Any
+    which no longer exist are removed from the sorted set.
+
+    """
     if per_page is None:
         per_page = app.config.get('FEED_ITEMS_PER_PAGE')
 
-    total = r.zcard(k.USER_FOLLOWING.format(uid))
-    fids = r.zrevrange(k.USER_FOLLOWING.format(uid), (page - 1) * per_page,
-                       (page * per_page) - 1)
-    users = []
-    for fid in fids:
-        user = get_user(fid)
-        if user:
-            users.append(user)
-        else:
-            # Self cleaning sorted sets
-            r.zrem(k.USER_FOLLOWING.format(uid), fid)
-            total = r.zcard(k.USER_FOLLOWING.format(id))
+    total = r.zcard(key)
+    user_ids = r.zrevrange(key, (page - 1) * per_page, (page * per_page) - 1)
+
+    cursor = m.db.users.find({'_id': {'$in': user_ids}}, USER_LIST_FIELDS)
+    found = dict((user.get('_id'), user) for user in cursor)
+
+    # Keep the order from Redis
+    users = [found[user_id] for user_id in user_ids if user_id in found]
+
+    if len(users) < len(user_ids):
+        # Self cleaning sorted sets
+        r.zrem(key, *[user_id for user_id in user_ids
+                      if user_id not in found])
+        total = r.zcard(key)
 
     return Pagination(users, total, page, per_page)
 
 
+def get_following(uid, page=1, per_page=None):
+    """Returns a list of users uid is following as a pagination object."""
+    return _get_users_page(k.USER_FOLLOWING.format(uid), page, per_page)
+
+
 def get_followers(uid, page=1, per_page=None):
     """Returns a list of users who follow user with uid as a pagination object.
 
     """
-    if per_page is None:
-        per_page = app.config.get('FEED_ITEMS_PER_PAGE')
-
-    total = r.zcard(k.USER_FOLLOWERS.format(uid))
-    fids = r.zrevrange(k.USER_FOLLOWERS.format(uid), (page - 1) * per_page,
-                       (page * per_page) - 1)
-    users = []
-    for fid in fids:
-        user = get_user(fid)
-        if user:
-            users.append(user)
-        else:
-            # Self cleaning sorted sets
-            r.zrem(k.USER_FOLLOWERS.format(uid), fid)
-            total = r.zcard(k.USER_FOLLOWERS.format(uid))
-
-    return Pagination(users, total, page, per_page)
+    return _get_users_page(k.USER_FOLLOWERS.format(uid), page, per_page)
 
 
 def get_trusted(uid, page=1, per_page=None):
     """Returns a list of users who a user trusts.
 
     """
-    if per_page is None:
-        per_page = app.config.get('FEED_ITEMS_PER_PAGE')
-
-    total = r.zcard(k.USER_APPROVED.format(uid))
-    fids = r.zrevrange(k.USER_APPROVED.format(uid), (page - 1) * per_page,
-                       (page * per_page) - 1)
-    users = []
-    for fid in fids:
-        user = get_user(fid)
-        if user:
-            users.append(user)
-        else:
-            # Self cleaning sorted sets
-            r.zrem(k.USER_FOLLOWERS.format(uid), fid)
-            total = r.zcard(k.USER_FOLLOWERS.format(uid))
-
-    return Pagination(users, total, page, per_page)
+    return _get_users_page(k.USER_APPROVED.format(uid), page, per_page)
 
 
 def is_following(who_id, whom_id):
     """Check to see if who is following whom.
 
     """
-    if r.zrank(k.USER_FOLLOWING.format(who_id), whom_id) is not None:
+    if r.zscore(k.USER_FOLLOWING.format(who_id), whom_id) is not None:
         return True
     return False
 
 
+def get_is_following(who_id, whom_ids):
+    """Check which of the users in `whom_ids` who is following. Returns a dict
+    mapping each of `whom_ids` to `True` or `False`.
+
+    All of the checks are sent to Redis in one pipeline.
+
+    """
+    pipe = r.pipeline(transaction=False)
+    for whom_id in whom_ids:
+        pipe.zscore(k.USER_FOLLOWING.format(who_id), whom_id)
+
+    return dict((whom_id, score is not None)
+                for whom_id, score in zip(whom_ids, pipe.execute()))
+
+
 def is_trusted(who_id, whom_id):
     """Is the current user approved by the user with who_id"""
-    if r.zrank(k.USER_APPROVED.format(who_id), whom_id) is not None:
+    if r.zscore(k.USER_APPROVED.format(who_id), whom_id) is not None:
         return True
     return False
 
 
+def get_is_trusted(who_id, whom_ids):
+    """Check which of the users in `whom_ids` who has approved. Returns a dict
+    mapping each of `whom_ids` to `True` or `False`.
+
+    All of the checks are sent to Redis in one pipeline.
+
+    """
+    pipe = r.pipeline(transaction=False)
+    for whom_id in whom_ids:
+        pipe.zscore(k.USER_APPROVED.format(who_id), whom_id)
+
+    return dict((whom_id, score is not None)
+                for whom_id, score in zip(whom_ids, pipe.execute()))
+
+
 def search(query, page=1, per_page=None):
     """Search for users / hashtagged posts (not replies)."""
     if per_page is None:
@@ -311,23 +324,16 @@ def search(query, page=1, per_page=None):
     query = SEARCH_RE.sub('', query)
 
     if len(query) > 0:
-        # Get the total number of documents returned
-        results = []
-        total = 0
-
         users = []
         if search_users:
             # We will concatenate the glob pattern to the query
             cursor = m.db.users.find({
                 'username': {'$regex': '^{}'.format(query)},
                 'active': True
-            }).sort(
+            }, USER_LIST_FIELDS).sort(
                 'username', pymongo.ASCENDING
             ).limit(max_items)
 
-            # You can count the length of the cursor
-            total += cursor.count()
-
             for user in cursor:
                 users.append(user)
 
@@ -340,33 +346,14 @@ def search(query, page=1, per_page=None):
                 'hashtags.hashtag', pymongo.ASCENDING
             ).limit(max_items)
 
-            total += cursor.count()
-
-            preprocessed_posts = []
-            user_ids = []
-
-            for hashtag in cursor:
-                user_ids.append(hashtag.get('user_id'))
-                preprocessed_posts.append(hashtag)
-
-            cursor = m.db.users.find({'_id': {'$in': user_ids}},
-                                     {'avatar': True, 'donated': True})
-
-            post_users = dict((user.get('_id'), {
-                'avatar': user.get('avatar'),
-                'donated': user.get('donated', False)
-            }) for user in cursor)
-
-            # Add the e-mails to the posts
-            for post in preprocessed_posts:
-                post['user_avatar'] = \
-                    post_users.get(post.get('user_id')).get('avatar')
-                post['user_donated'] = \
-                    post_users.get(post.get('user_id')).get('donated')
-                posts.append(post)
+            posts = attach_authors(list(cursor))
 
         results = users + posts
 
+        # Everything matching (up to `max_items` of each) has been fetched so
+        # there is no need to ask MongoDB to count the matches as well
+        total = len(results)
+
         def sort_results(k):
             """Allow sorting of the search results by closest matchng
             then by date the item was created."""
@@ -449,7 +436,7 @@ def get_alerts(user_id, page=1, per_page=None):
     # Try and cast the value to an int so we can boolean compare them
     try:
         alerts_last_checked = m.db.users.find_one(
-            {'_id': user_id}
+            {'_id': user_id}, {'alerts_last_checked': True}
         ).get('alerts_last_checked')
     except (AttributeError, TypeError, ValueError):
         alerts_last_checked = 0
@@ -464,9 +451,8 @@ def get_alerts(user_id, page=1, per_page=None):
 
     alerts = []
 
-    for aid in aids:
-        # Load the alert in to the alert manager
-        alert = am.get(aid)
+    # Load all the alerts on the page in to the alert manager at once
+    for aid, alert in zip(aids, am.get_many(aids)):
         if alert:
             # Check to see if the alert is newer than the time we last checked.
             # This allows us to highlight in the template
@@ -504,16 +490,16 @@ def new_alerts(user_id):
     """Checks too see if user has any new alerts since they last got the them.
 
     """
-    # Get the stamp since last check from Redis
+    # Get the stamp since last check from MongoDB
     # If this has not been called before make it 0
-    alerts_last_checked = get_user(user_id).get('alerts_last_checked', 0)
-
-    # Do the check. This will just see if there is anything returned from the
-    # sorted set newer than the last_checked timestamp, SIMPLES.
-    #
-    # Note: zrevrangebyscore has max and min the wrong way round :P
-    return len(r.zrevrangebyscore(k.USER_ALERTS.format(user_id), '+inf',
-               alerts_last_checked))
+    alerts_last_checked = m.db.users.find_one(
+        {'_id': user_id}, {'alerts_last_checked': True}
+    ).get('alerts_last_checked', 0)
+
+    # Do the check. This will just count the alerts in the sorted set newer
+    # than the last_checked timestamp without fetching them, SIMPLES.
+    return r.zcount(k.USER_ALERTS.format(user_id), alerts_last_checked,
+                    '+inf')
 
 
 def remove_tip(user_id, tip_name):
@@ -13,16 +13,16 @@ from datetime import datetime
 import math
 # 3rd party imports
 from flask import (
-    abort, flash, redirect, render_template, request, url_for,
+    abort, flash, g, redirect, render_template, request, url_for,
     Blueprint, current_app as app, jsonify
 )
 # Pjuu imports
 from pjuu.auth import current_user
 from pjuu.auth.forms import SignInForm
-from pjuu.auth.utils import get_uid, get_uid_username
+from pjuu.auth.utils import get_uid_or_404, get_uid_username
 from pjuu.auth.decorators import login_required
-from pjuu.lib import handle_next, timestamp, keys as k
-from pjuu.lib.pagination import handle_page
+from pjuu.lib import handle_next, stream_template, timestamp, keys as k
+from pjuu.lib.pagination import handle_before, handle_page
 from pjuu.posts.backend import get_posts
 from pjuu.posts.forms import PostForm
 from pjuu.users.forms import ChangeProfileForm, SearchForm
@@ -32,7 +32,8 @@ from pjuu.users.backend import (
     new_alerts as be_new_alerts, delete_alert as be_delete_alert,
     remove_from_feed as be_rem_from_feed, update_profile_settings,
     get_user_permission, is_trusted, approve_user, unapprove_user,
-    top_users_by_score, remove_tip, reset_tips as be_reset_tips, get_trusted
+    top_users_by_score, remove_tip, reset_tips as be_reset_tips, get_trusted,
+    get_is_following, get_is_trusted
 )
 
 
@@ -45,10 +46,34 @@ def load_jinja2_functions():
     app.jinja_env.globals.update(top_users_by_score=top_users_by_score)
 
 
+@users_bp.app_template_global('preload_following')
+def preload_following(items):
+    """Checks if the current user is following (and on the followers and
+    trusted lists, trusts) each of the users in `items` at once so the
+    `following` and `trusted` filters don't need to go to Redis for each.
+
+    Lists use this before rendering their items:
+        {% set _ = preload_following(pagination.items) %}
+
+    """
+    if current_user:
+        user_ids = [item.get('_id') for item in items
+                    if isinstance(item, dict) and 'email' in item]
+        g.following = get_is_following(current_user.get('_id'), user_ids)
+
+        # Only these lists show whether the user trusts each item
+        if request.endpoint in ('users.followers', 'users.trusted'):
+            g.trusted = get_is_trusted(current_user.get('_id'), user_ids)
+    return ''
+
+
 @users_bp.app_template_filter('following')
 def following_filter(_profile):
     """Checks if current user is following the user piped to filter."""
     if current_user:
+        following = g.get('following', {})
+        if _profile.get('_id') in following:
+            return following[_profile.get('_id')]
         return is_following(current_user.get('_id'), _profile.get('_id'))
     return False
 
@@ -65,6 +90,9 @@ def follower_filter(_profile):
 def trusted_filter(_profile):
     """Checks if current user has approved the user piped to filter."""
     if current_user:
+        trusted = g.get('trusted', {})
+        if _profile.get('_id') in trusted:
+            return trusted[_profile.get('_id')]
         return is_trusted(current_user.get('_id'), _profile.get('_id'))
     return False
 
@@ -171,7 +199,7 @@ def feed():
 
     # Post form
     post_form = PostForm()
-    return render_template('feed.html', pagination=pagination,
+    return stream_template('feed.html', pagination=pagination,
                            post_form=post_form)
 
 
@@ -218,7 +246,9 @@ def profile(username):
         current_user_id = None
     permission = get_user_permission(_profile.get('_id'), current_user_id)
 
-    _posts = get_posts(uid, page, page_size, perm=permission)
+    before, before_id = handle_before(request)
+    _posts = get_posts(uid, page, page_size, perm=permission, before=before,
+                       before_id=before_id)
 
     # Post form
     post_form = PostForm()
@@ -230,10 +260,7 @@ def profile(username):
 @login_required
 def following(username):
     """Returns all users following the current user as a pagination."""
-    user_id = get_uid(username)
-
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     # Data
     _profile = get_profile(user_id)
@@ -253,10 +280,7 @@ def following(username):
 @login_required
 def followers(username):
     """Returns all a users followers as a pagination object."""
-    user_id = get_uid(username)
-
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     # Data
     _profile = get_profile(user_id)
@@ -276,10 +300,7 @@ def followers(username):
 @login_required
 def trusted(username):
     """Returns all a users followers as a pagination object."""
-    user_id = get_uid(username)
-
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     # Only the user who's profile it is can see there trusted users
     if user_id != current_user.get('_id'):
@@ -306,11 +327,8 @@ def follow(username):
     redirect_url = handle_next(request, url_for('users.following',
                                username=current_user.get('username')))
 
-    user_id = get_uid(username)
-
     # If we don't get a uid from the username the page doesn't exist
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     # Unfollow user, ensure the user doesn't unfollow themself
     if user_id != current_user.get('_id'):
@@ -329,11 +347,8 @@ def unfollow(username):
     redirect_url = handle_next(request, url_for('users.following',
                                username=current_user.get('username')))
 
-    user_id = get_uid(username)
-
     # If we don't get a uid from the username the page doesn't exist
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     # Unfollow user, ensure the user doesn't unfollow themself
     if user_id != current_user.get('_id'):
@@ -352,11 +367,8 @@ def approve(username):
     redirect_url = handle_next(request, url_for('users.followers',
                                username=current_user.get('username')))
 
-    user_id = get_uid(username)
-
     # If we don't get a uid from the username the page doesn't exist
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     if user_id != current_user.get('_id'):
         if approve_user(current_user.get('_id'), user_id):
@@ -377,11 +389,8 @@ def unapprove(username):
     redirect_url = handle_next(request, url_for('users.followers',
                                username=current_user.get('username')))
 
-    user_id = get_uid(username)
-
     # If we don't get a uid from the username the page doesn't exist
-    if user_id is None:
-        abort(404)
+    user_id = get_uid_or_404(username)
 
     if user_id != current_user.get('_id'):
         if unapprove_user(current_user.get('_id'), user_id):
@@ -538,9 +547,17 @@ def new_alerts():
         return abort(403)
 
     uid = current_user.get('_id')
+    count = be_new_alerts(uid)
+
+    # This is polled, the count only changes when an alert is added or the
+    # user checks their alerts. Let the browser revalidate it's copy with the
+    # ETag so an unchanged count is answered with an empty 304.
+    response = jsonify({'new_alerts': count})
+    response.set_etag('{0}:{1}'.format(uid, count))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
 
-    # If a user has alerts then return a 200 else a 404
-    return jsonify({'new_alerts': be_new_alerts(uid)})
+    return response.make_conditional(request)
 
 
 @users_bp.route('/tips/<tip_name>/hide', methods=['POST'])
@@ -22,19 +22,29 @@ class BackendTestCase(unittest.TestCase):
 
     """
 
+    # The app is created by the first test to run and shared by the rest. It
+    # holds no state between tests, the databases are cleared after each.
+    _app = None
+
     def setUp(self):
         """Recreate our indexes inside MongoDB
 
         """
-        # Create flask app and context
-        self.app = create_app(config_dict={
-            'TESTING': 'True',
-            'SERVER_NAME': 'localhost',
-            'WTF_CSRF_ENABLED': False,
-            'MONGO_URI': 'mongodb://localhost:27017/pjuu_testing',
-            'REDIS_DB': 2,
-            'SESSION_REDIS_DB': 3
-        })
+        # Create flask app (once) and context
+        if BackendTestCase._app is None:
+            BackendTestCase._app = create_app(config_dict={
+                'TESTING': 'True',
+                'SERVER_NAME': 'localhost',
+                'WTF_CSRF_ENABLED': False,
+                'MONGO_URI': 'mongodb://localhost:27017/pjuu_testing',
+                'REDIS_DB': 2,
+                'SESSION_REDIS_DB': 3,
+                # Hashing passwords properly is the slowest part of most tests
+                'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1',
+                'PASSWORD_SALT_LENGTH': 8
+            })
+
+        self.app = BackendTestCase._app
         self.app_ctx = self.app.app_context()
         self.app_ctx.push()
 
@@ -44,14 +54,17 @@ class BackendTestCase(unittest.TestCase):
         ensure_indexes()
 
     def tearDown(self):
-        """Flush the Redis database and drop the Mongo database
+        """Flush the Redis database and empty the Mongo database
 
         """
         # Clear the databases
         r.flushdb()
 
-        # Clean up Mongo only after each test.
-        m.cx.drop_database('pjuu_testing')
+        # Clean up Mongo only after each test. The collections are emptied
+        # rather than dropped so the indexes don't need building every test.
+        for name in m.db.list_collection_names():
+            if not name.startswith('system.'):
+                m.db[name].remove({})
 
         self.app_ctx.pop()
 
@@ -71,3 +84,13 @@ class FrontendTestCase(BackendTestCase):
     def tearDown(self):
         self.req_ctx.pop()
         super(FrontendTestCase, self).tearDown()
+
+    def login_as(self, user_id):
+        """Sign `user_id` in on the test client by writing straight to the
+        session. This skips the signin form and checking the password hash.
+
+        Only use this when the test is not about signing in.
+
+        """
+        with self.client.session_transaction() as session:
+            session['user_id'] = user_id
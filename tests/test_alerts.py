@@ -84,6 +84,8 @@ class AlertTests(BackendTestCase):
 
         # Ensure the length of user1's alert feed is 1
         self.assertEqual(r.zcard(k.USER_ALERTS.format(user1)), 1)
+        # Ensure the alert will expire
+        self.assertGreater(r.ttl(k.ALERT.format(alert.alert_id)), 0)
 
         # Get alerts for user1, user Redis directly
         alerts = r.zrange(k.USER_ALERTS.format(user1), 0, 0)
@@ -93,6 +95,13 @@ class AlertTests(BackendTestCase):
         self.assertEqual(alert.user.get('username'), 'user2')
         self.assertEqual(alert.user.get('email'), 'user2@pjuu.com')
 
+        # Load many alerts at once, missing alerts come back as None
+        alerts_many = am.get_many([alerts[0], k.NIL_VALUE])
+        self.assertEqual(len(alerts_many), 2)
+        self.assertEqual(alerts_many[0].user.get('username'), 'user2')
+        self.assertIsNone(alerts_many[1])
+        self.assertEqual(am.get_many([]), [])
+
         # Delete test2 and ensure getting the alert returns None
         delete_account(user2)
         alert = am.get(alerts[0])
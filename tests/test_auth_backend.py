@@ -10,6 +10,7 @@
 import json
 
 from flask import current_app as app, session
+from werkzeug.exceptions import NotFound
 
 from pjuu import mongo as m, redis as r
 from pjuu.auth.backend import (
@@ -17,11 +18,12 @@ from pjuu.auth.backend import (
     bite, change_password, change_email, activate, ban, signin, signout,
     user_exists
 )
-from pjuu.auth.utils import get_uid, get_uid_email, get_uid_username
+from pjuu.auth.utils import (get_uid, get_uid_email, get_uid_or_404,
+                             get_uid_username, get_uids_username)
 from pjuu.auth.stats import get_stats
 from pjuu.lib import keys as K
 from pjuu.posts.backend import create_post
-from pjuu.users.backend import follow_user, get_user
+from pjuu.users.backend import approve_user, follow_user, get_user
 
 from tests import BackendTestCase
 
@@ -86,6 +88,15 @@ class AuthBackendTests(BackendTestCase):
         self.assertEqual(get_uid_username('user1'), user1)
         self.assertEqual(get_uid_email('user1@pjuu.com'), user1)
 
+        # Look up many usernames at once, invalid names are left out
+        self.assertEqual(get_uids_username(['User1', 'testymctest']),
+                         {'user1': user1})
+        self.assertEqual(get_uids_username([]), {})
+
+        # The view helper aborts rather than returning None
+        self.assertEqual(get_uid_or_404('user1'), user1)
+        self.assertRaises(NotFound, get_uid_or_404, 'testymctest')
+
         # Create a new user to check the defaults
         user2 = create_account('user2', 'user2@pjuu.com', 'Password')
 
@@ -106,6 +117,13 @@ class AuthBackendTests(BackendTestCase):
         self.assertEqual(user.get('alerts_last_checked'), -1)
         self.assertIsNotNone(user.get('ttl'))
 
+        # Non-active users are only found if asked for
+        self.assertEqual(get_uids_username(['user1', 'user2']),
+                         {'user1': user1})
+        self.assertEqual(get_uids_username(['user1', 'user2'],
+                                           non_active=True),
+                         {'user1': user1, 'user2': user2})
+
         # Generated values, we don't know what they SHOULD be
         self.assertIsNotNone(user.get('password'))
         self.assertIsNotNone(user.get('created'))
@@ -130,9 +148,14 @@ class AuthBackendTests(BackendTestCase):
         self.assertTrue(activate(user1))
         self.assertTrue(get_user(user1).get('active'))
         self.assertIsNone(get_user(user1).get('ttl'))
+        # Active users are cached when looked up by username
+        self.assertEqual(get_uid_username('user1'), user1)
+        self.assertEqual(r.get(K.USERNAME.format('user1')), user1)
         # Deactivate
         self.assertTrue(activate(user1, False))
         self.assertFalse(get_user(user1).get('active'))
+        self.assertIsNone(get_uid_username('user1'))
+        self.assertEqual(get_uid_username('user1', non_active=True), user1)
         # Invalid
         self.assertFalse(activate(None))
         self.assertFalse(activate(K.NIL_VALUE))
@@ -284,6 +307,13 @@ class AuthBackendTests(BackendTestCase):
         self.assertIsNone(get_uid_username('user1'))
         self.assertIsNone(get_uid_email('user1@pjuu.com'))
 
+        # Ensure a cached username lookup is forgotten
+        user2 = create_account('user2', 'user2@pjuu.com', 'Password')
+        activate(user2)
+        self.assertEqual(get_uid_username('user2'), user2)
+        delete_account(user2)
+        self.assertIsNone(get_uid_username('user2'))
+
     def test_delete_account_posts_replies(self):
         """Do all posts and replies get removed on deletion of account?
 
@@ -329,6 +359,10 @@ class AuthBackendTests(BackendTestCase):
         self.assertIn(user1, r.zrange(K.USER_FOLLOWERS.format(user2), 0, -1))
         self.assertIn(user1, r.zrange(K.USER_FOLLOWING.format(user2), 0, -1))
 
+        # Trust each other too
+        self.assertTrue(approve_user(user1, user2))
+        self.assertTrue(approve_user(user2, user1))
+
         delete_account(user1)
 
         # Ensure sorted sets are emptied
@@ -340,6 +374,10 @@ class AuthBackendTests(BackendTestCase):
                                          0, -1))
         self.assertNotIn(user1, r.zrange(K.USER_FOLLOWING.format(user2),
                                          0, -1))
+        self.assertNotIn(user2, r.zrange(K.USER_APPROVED.format(user1),
+                                         0, -1))
+        self.assertNotIn(user1, r.zrange(K.USER_APPROVED.format(user2),
+                                         0, -1))
 
     def test_dump_account(self):
         """Can a user get their data?
@@ -416,11 +416,8 @@ class AuthFrontendTests(FrontendTestCase):
         # Activate the account
         self.assertTrue(activate(user1))
 
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        # Log the user in
+        self.login_as(user1)
         # Lets check to see that our current email is listed on the inital
         # settings page
         resp = self.client.get(url_for('users.settings_profile'))
@@ -518,11 +515,7 @@ class AuthFrontendTests(FrontendTestCase):
         # Activate the account
         self.assertTrue(activate(user1))
         # Log the user in
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Go to the change password page
         resp = self.client.get(url_for('auth.change_password'))
@@ -585,11 +578,7 @@ class AuthFrontendTests(FrontendTestCase):
         # Activate the account
         self.assertTrue(activate(user1))
         # Log the user in
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Check that we can get to the delete_account page
         resp = self.client.get(url_for('auth.delete_account'))
@@ -641,11 +630,7 @@ class AuthFrontendTests(FrontendTestCase):
         self.assertEqual(resp.status_code, 302)
 
         # Log the user in
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Check that a password confirmation is now required
         resp = self.client.get(url_for('auth.dump_account'))
@@ -678,11 +663,9 @@ class AuthFrontendTests(FrontendTestCase):
             'password': 'Password'
         })
 
-        session_id = None
-        for header in resp.headers:
-            if header[0] == 'Set-Cookie':
-                session_id = parse_cookie(header[1])['session']
-                rs.delete(session_id)
+        cookies = resp.headers.get_all('Set-Cookie')
+        session_id = parse_cookie(cookies[0])['session']
+        rs.delete(session_id)
 
         resp = self.client.post(url_for('auth.signin'), data={
             'username': 'user1',
@@ -691,10 +674,8 @@ class AuthFrontendTests(FrontendTestCase):
 
         # Find the Set-Cookie header so we can parse it and check the session
         # identifier has been updated
-        for header in resp.headers:
-            if header[0] == 'Set-Cookie':
-                self.assertNotEqual(session_id,
-                                    parse_cookie(header[1])['session'])
+        cookies = resp.headers.get_all('Set-Cookie')
+        self.assertNotEqual(session_id, parse_cookie(cookies[0])['session'])
 
     def test_xhr_decorators(self):
         """Ensure we get a 403 if we XHR request something we need to logged
@@ -0,0 +1,35 @@
+# -*- coding: utf8 -*-
+
+"""MongoDB index tests.
+
+:license: AGPL v3, see LICENSE for more details
+:copyright: 2014-2021 Joe Doherty
+
+"""
+
+import pymongo
+
+from pjuu import mongo as m
+from pjuu.lib.indexes import ensure_indexes
+
+from tests import BackendTestCase
+
+
+class IndexesTests(BackendTestCase):
+
+    def test_superseded_post_indexes_dropped(self):
+        """Ensure the old single field post indexes are removed."""
+        m.db.posts.create_index([('user_id', pymongo.DESCENDING)])
+        self.assertIn('user_id_-1', m.db.posts.index_information())
+
+        ensure_indexes()
+
+        indexes = m.db.posts.index_information()
+        self.assertNotIn('user_id_-1', indexes)
+        self.assertNotIn('reply_to_-1', indexes)
+        self.assertNotIn('hashtags.hashtag_-1', indexes)
+        self.assertNotIn('user_id_-1_created_-1', indexes)
+        self.assertIn('user_id_-1_created_-1__id_-1', indexes)
+
+        # Running it again with nothing to drop is fine
+        ensure_indexes()
@@ -8,7 +8,7 @@
 """
 
 # Pjuu imports
-from pjuu.lib.pagination import Pagination, handle_page
+from pjuu.lib.pagination import Pagination, handle_before, handle_page
 # Test imports
 from tests import BackendTestCase
 
@@ -74,6 +74,22 @@ class PaginationTests(BackendTestCase):
         p = Pagination(ls[:50], len(ls), 1, 100)
         self.assertEqual(p.last_page, 10)
 
+        # Lists which aren't counted rely on `has_next`
+        p = Pagination(ls[:50], None, 1, 50, has_next=True)
+        self.assertIsNone(p.pages)
+        self.assertIsNone(p.last_page)
+        self.assertIsNone(p.prev_page)
+        self.assertEqual(p.next_page, 2)
+        self.assertTrue(p.has_pages)
+
+        p = Pagination(ls[:50], None, 2, 50)
+        self.assertEqual(p.prev_page, 1)
+        self.assertIsNone(p.next_page)
+        self.assertTrue(p.has_pages)
+
+        p = Pagination(ls[:50], None, 1, 50)
+        self.assertFalse(p.has_pages)
+
     def test_handle_page(self):
         """Check the handle_page function, this is important as it stops Redis
         going crazy if the index is too high on a list or sorted set.
@@ -101,3 +117,50 @@ class PaginationTests(BackendTestCase):
         self.assertEqual(handle_page(request), 1)
         request.args['page'] = {}
         self.assertEqual(handle_page(request), 1)
+
+        # Values from the query string are strings
+        request.args['page'] = '2'
+        self.assertEqual(handle_page(request), 2)
+        request.args['page'] = '-1'
+        self.assertEqual(handle_page(request), 1)
+        request.args['page'] = '0'
+        self.assertEqual(handle_page(request), 1)
+        request.args['page'] = '1000000000000'
+        self.assertEqual(handle_page(request), 4294967295)
+        request.args['page'] = 'bob'
+        self.assertEqual(handle_page(request), 1)
+        request.args['page'] = '\u00b2'
+        self.assertEqual(handle_page(request), 1)
+        # Too many digits for int() to convert
+        request.args['page'] = '9' * 5000
+        self.assertEqual(handle_page(request), 1)
+
+    def test_handle_before(self):
+        """Check the handle_before function only ever returns a finite float
+        and a hex id, or None.
+
+        """
+        class Request(object):
+            args = {}
+        request = Request()
+
+        self.assertEqual(handle_before(request), (None, None))
+        request.args['before'] = '1500000000.5'
+        self.assertEqual(handle_before(request), (1500000000.5, None))
+        request.args['before_id'] = '0123456789abcdef0123456789abcdef'
+        self.assertEqual(handle_before(request),
+                         (1500000000.5, '0123456789abcdef0123456789abcdef'))
+
+        # Ensure it does not brake with invalid values
+        request.args['before_id'] = 'bob'
+        self.assertEqual(handle_before(request), (1500000000.5, None))
+        request.args['before_id'] = {}
+        self.assertEqual(handle_before(request), (1500000000.5, None))
+        request.args['before'] = 'nan'
+        self.assertEqual(handle_before(request), (None, None))
+        request.args['before'] = 'inf'
+        self.assertEqual(handle_before(request), (None, None))
+        request.args['before'] = 'bob'
+        self.assertEqual(handle_before(request), (None, None))
+        request.args['before'] = {}
+        self.assertEqual(handle_before(request), (None, None))
@@ -129,3 +129,14 @@ class ParserTests(BackendTestCase):
         mentions = parse_mentions('@user1\'s')
         self.assertEqual(mentions[0]['username'], 'user1')
         self.assertEqual(mentions[0]['user_id'], user1)
+
+    def test_not_delimited(self):
+        """Mentions and hashtags must be surrounded by delimiters"""
+        mentions = parse_mentions('joe@pjuu @joe/ @joe- x@joe @joe.',
+                                  check_user=False)
+        self.assertEqual(len(mentions), 1)
+        self.assertEqual(mentions[0]['span'], (27, 31))
+
+        hashtags = parse_hashtags('#pjuu/ a#pjuu #pjuu-x #pjuu')
+        self.assertEqual(len(hashtags), 1)
+        self.assertEqual(hashtags[0]['span'], (22, 27))
@@ -8,6 +8,7 @@
 """
 
 import io
+from unittest import mock
 
 from flask import current_app as app
 
@@ -17,9 +18,9 @@ from pjuu.auth.utils import get_user
 from pjuu.lib import keys as K, timestamp
 from pjuu.posts.backend import (
     AlreadyVoted, CantVoteOnOwn, CommentingAlert, SubscriptionReasons,
-    TaggingAlert, check_post, create_post, delete_post, get_post, get_posts,
-    get_replies, is_subscribed, subscribe, unsubscribe, vote_post,
-    get_hashtagged_posts, has_voted)
+    TaggingAlert, attach_authors, check_post, create_post, delete_post,
+    get_post, get_posts, get_replies, is_subscribed, subscribe, unsubscribe,
+    vote_post, get_hashtagged_posts, has_voted, get_subscribers, get_votes)
 from pjuu.posts.stats import get_stats
 from pjuu.users.backend import (
     follow_user, get_alerts, get_feed, approve_user
@@ -59,9 +60,14 @@ class PostBackendTests(BackendTestCase):
         # Ensure this post is the users feed (populate_feed)
         self.assertIn(post1, r.zrange(K.USER_FEED.format(user1), 0, -1))
 
+        # Only the requested fields are loaded when `fields` is passed
+        self.assertEqual(get_post(post1, fields={'user_id': True}),
+                         {'_id': post1, 'user_id': user1})
+
         # Testing getting post with invalid arguments
         # Test getting a post that does not exist
         self.assertIsNone(get_post(K.NIL_VALUE))
+        self.assertIsNone(get_post(K.NIL_VALUE, fields={}))
 
         # Create a post with an image
         image = io.BytesIO(
@@ -258,6 +264,39 @@ class PostBackendTests(BackendTestCase):
         self.assertEqual(len(get_posts(user1, per_page=50).items), 50)
         self.assertEqual(len(get_posts(user1, per_page=100).items), 100)
 
+        # Ensure following on from `next_before` gives the same page as
+        # skipping to it
+        page1 = get_posts(user1, per_page=25)
+        page2 = get_posts(user1, 2, per_page=25, before=page1.next_before,
+                          before_id=page1.next_before_id)
+        self.assertEqual([post.get('_id') for post in page2.items],
+                         [post.get('_id') for post in
+                          get_posts(user1, 2, per_page=25).items])
+        # Pages found this way are not counted
+        self.assertIsNone(page2.total)
+        self.assertEqual(page2.next_page, 3)
+        self.assertEqual(page2.next_before, page2.items[-1].get('created'))
+        self.assertEqual(page2.next_before_id, page2.items[-1].get('_id'))
+
+        # The last page says there are no more
+        page3 = get_posts(user1, 3, per_page=25, before=page2.next_before,
+                          before_id=page2.next_before_id)
+        page4 = get_posts(user1, 4, per_page=25, before=page3.next_before,
+                          before_id=page3.next_before_id)
+        self.assertEqual(len(page4.items), 25)
+        self.assertIsNone(page4.next_page)
+
+        # Posts created at the same time as the last one on a page are on the
+        # next page, not skipped
+        m.db.posts.update({'user_id': user1}, {'$set': {'created': 1.5}},
+                          multi=True)
+        page1 = get_posts(user1, per_page=25)
+        page2 = get_posts(user1, 2, per_page=25, before=page1.next_before,
+                          before_id=page1.next_before_id)
+        self.assertEqual(len(page2.items), 25)
+        self.assertFalse(set(post.get('_id') for post in page1.items) &
+                         set(post.get('_id') for post in page2.items))
+
     def test_get_replies(self):
         """Test getting all replies for a post
 
@@ -378,12 +417,20 @@ class PostBackendTests(BackendTestCase):
 
         # Ensure user 1 can not vote on there own post
         self.assertRaises(CantVoteOnOwn, lambda: vote_post(user1, post1))
+        self.assertRaises(CantVoteOnOwn,
+                          lambda: vote_post(user1, post1, author_uid=user1))
         # Ensure the scores have not been adjusted
         self.assertEqual(get_post(post1).get('score'), 1)
         self.assertEqual(get_user(user1).get('score'), 1)
 
         # Ensure the user has voted
         self.assertTrue(has_voted(user2, post1))
+        # Ensure votes can be looked up in bulk
+        self.assertEqual(get_votes(user2, [post1, K.NIL_VALUE]), {
+            post1: has_voted(user2, post1),
+            K.NIL_VALUE: None
+        })
+        self.assertEqual(get_votes(user2, []), {})
 
         # Check that a user can reverse their vote within TIMEOUT
         self.assertEqual(vote_post(user2, post1), 0)
@@ -555,6 +602,25 @@ class PostBackendTests(BackendTestCase):
         self.assertFalse(storage.exists(reply1_filename))
         self.assertFalse(storage.exists(reply2_filename))
 
+    def test_delete_replies_in_batches(self):
+        """Ensure every reply goes when there are more than fit in a batch."""
+        user1 = create_account('user1', 'user1@pjuu.com', 'Password')
+        user2 = create_account('user2', 'user2@pjuu.com', 'Password')
+
+        post1 = create_post(user1, 'user1', 'Test post')
+        replies = [create_post(user1, 'user1', 'Test comment', post1)
+                   for i in range(5)]
+        for reply in replies:
+            vote_post(user2, reply)
+
+        # Use a batch size which does not divide the number of replies
+        with mock.patch('pjuu.posts.backend.REPLY_BATCH_SIZE', 2):
+            delete_post(post1)
+
+        for reply in replies:
+            self.assertIsNone(get_post(reply))
+            self.assertFalse(r.exists(K.POST_VOTES.format(reply)))
+
     def test_subscriptions(self):
         """
         Test the backend subscription system.
@@ -652,6 +718,23 @@ class PostBackendTests(BackendTestCase):
         # Ensure that subscribe doe not happen when it is not a valid post
         self.assertFalse(subscribe(user1, K.NIL_VALUE,
                                    SubscriptionReasons.POSTER))
+        # Unless told not to check the post exists
+        subscribe(user1, K.NIL_VALUE, SubscriptionReasons.POSTER,
+                  check_exists=False)
+        self.assertTrue(is_subscribed(user1, K.NIL_VALUE))
+
+        # Subscriptions can be queued on a pipeline, nothing happens until it
+        # is executed
+        pipe = r.pipeline(transaction=False)
+        subscribe(user2, post2, SubscriptionReasons.TAGEE, pipe=pipe)
+        self.assertFalse(is_subscribed(user2, post2))
+        pipe.execute()
+        self.assertTrue(is_subscribed(user2, post2))
+
+        # Check the subscribers list and that a user can be left out of it
+        self.assertEqual(sorted(get_subscribers(post2)),
+                         sorted([user1, user2]))
+        self.assertEqual(get_subscribers(post2, exclude=user1), [user2])
 
     def test_alerts(self):
         """
@@ -678,6 +761,8 @@ class PostBackendTests(BackendTestCase):
         self.assertEqual(alert.user['username'], 'user1')
         self.assertEqual(alert.user['email'], 'user1@pjuu.com')
         self.assertIn('tagged you in a', alert.prettify())
+        # The post is loaded along with the alert
+        self.assertEqual(alert.post.get('username'), 'user1')
 
         # Have user2 comment on a the post and check that user1 has the alert
         create_post(user2, 'user2', 'Hello', post1)
@@ -713,6 +798,13 @@ class PostBackendTests(BackendTestCase):
         self.assertTrue(isinstance(alert, CommentingAlert))
         self.assertIn('you are subscribed to', alert.prettify(user3))
 
+        # Alerts about posts which have been deleted are not returned
+        post2 = create_post(user1, 'user1', 'Hello again @user2')
+        self.assertEqual(get_alerts(user2).items[0].post_id, post2)
+        delete_post(post2)
+        self.assertNotIn(post2, [alert.post_id
+                                 for alert in get_alerts(user2).items])
+
     def test_stats(self):
         """Ensure the ``pjuu.posts`` exposed stats are correct
 
@@ -775,3 +867,27 @@ class PostBackendTests(BackendTestCase):
 
         post = get_post(post3)
         self.assertEqual(post.get('permission'), 2)
+
+    def test_attach_authors(self):
+        """Ensure authors are added to posts in one go and posts with no
+        author are dropped"""
+        user1 = create_account('user1', 'user1@pjuu.com', 'Password')
+        user2 = create_account('user2', 'user2@pjuu.com', 'Password')
+
+        post1 = create_post(user1, 'user1', 'Test post')
+        post2 = create_post(user2, 'user2', 'Test post')
+
+        m.db.users.update({'_id': user2}, {'$set': {'donated': True}})
+
+        posts = attach_authors([
+            m.db.posts.find_one({'_id': post1}),
+            m.db.posts.find_one({'_id': post2}),
+            {'_id': 'missing', 'user_id': 'missing'}
+        ])
+
+        self.assertEqual([post.get('_id') for post in posts], [post1, post2])
+        self.assertIsNone(posts[0].get('user_avatar'))
+        self.assertFalse(posts[0].get('user_donated'))
+        self.assertTrue(posts[1].get('user_donated'))
+
+        self.assertEqual(attach_authors([]), [])
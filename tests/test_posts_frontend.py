@@ -10,6 +10,7 @@
 import io
 import json
 from time import sleep
+import unittest
 
 from flask import url_for
 
@@ -33,6 +34,22 @@ class PostFrontendTests(FrontendTestCase):
     and forms
     """
 
+    @classmethod
+    def setUpClass(cls):
+        """Read the test images once, tests wrap them in a new `BytesIO`."""
+        with open('tests/upload_test_files/otter.jpg', 'rb') as f:
+            cls.OTTER_JPG = f.read()
+        with open('tests/upload_test_files/otter.png', 'rb') as f:
+            cls.OTTER_PNG = f.read()
+
+    def assertUploadShown(self, resp, post_id, upload, kind='post'):
+        """Check the page in `resp` shows `upload` on the post (or reply)
+        `post_id`."""
+        data = resp.get_data(as_text=True)
+        self.assertIn('<!-- upload:{}:{} -->'.format(kind, post_id), data)
+        self.assertIn('<img src="{}"/>'.format(
+            storage.url_for('posts.get_upload', filename=upload)), data)
+
     def test_post(self):
         """
         Test that we can post too Pjuu.
@@ -55,11 +72,7 @@ class PostFrontendTests(FrontendTestCase):
         # Activate the account
         self.assertTrue(activate(user1))
         # # Log the user in
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # We are now logged in :) Let's ensure we can't GET the /post endpoint
         resp = self.client.get(url_for('posts.post'))
@@ -139,11 +152,7 @@ class PostFrontendTests(FrontendTestCase):
         self.client.get(url_for('auth.signout'))
 
         # Sign back in as user1 so that we can keep testing
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Back to testing. Let's ensure that users can post unicode text
         # I copied this Chinese text from a header file on my Mac. I do not
@@ -217,8 +226,7 @@ class PostFrontendTests(FrontendTestCase):
                       resp.get_data(as_text=True))
 
         # Ensure that posting an image with no text allows it
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
+        image = io.BytesIO(self.OTTER_JPG)
         resp = self.client.post(
             url_for('posts.post'),
             data={
@@ -230,8 +238,7 @@ class PostFrontendTests(FrontendTestCase):
         self.assertEqual(resp.status_code, 200)
 
         # Test posting with an image
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
+        image = io.BytesIO(self.OTTER_JPG)
         resp = self.client.post(
             url_for('posts.post'),
             data={
@@ -249,31 +256,18 @@ class PostFrontendTests(FrontendTestCase):
 
         # So that we can check the data is in the templates, upload a post
         # in the backend and ensure it appears where it should
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.png', 'rb').read())
+        image = io.BytesIO(self.OTTER_PNG)
         post1 = create_post(user1, 'user1', 'Test post', upload=image)
         self.assertIsNotNone(post1)
-        post = get_post(post1)
+        post = get_post(post1, fields={'upload': True})
         resp = self.client.get(url_for('users.feed'))
-        self.assertIn('<!-- upload:post:{} -->'.format(post1),
-                      resp.get_data(as_text=True))
-        self.assertIn(
-            '<img src="{}"/>'.format(
-                storage.url_for('posts.get_upload',
-                                filename=post.get('upload'))),
-            resp.get_data(as_text=True))
+        self.assertUploadShown(resp, post1, post.get('upload'))
 
         # Although the below belongs in `test_view_post` we are just going to
         # check it here for simplicity
         resp = self.client.get(url_for('posts.view_post', username='user1',
                                        post_id=post1))
-        self.assertIn('<!-- upload:post:{} -->'.format(post1),
-                      resp.get_data(as_text=True))
-        self.assertIn(
-            '<img src="{}"/>'.format(
-                storage.url_for('posts.get_upload',
-                                filename=post.get('upload'))),
-            resp.get_data(as_text=True))
+        self.assertUploadShown(resp, post1, post.get('upload'))
 
         # Test posting with no data
         resp = self.client.post(url_for('posts.post',
@@ -289,10 +283,7 @@ class PostFrontendTests(FrontendTestCase):
         """Ensure posts are truncated to `LINE_CAP` on feeds and profiles"""
         user1 = create_account('user1', 'user1@pjuu.com', 'Password')
         activate(user1)
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         resp = self.client.post(url_for('posts.post',
                                         next=url_for('users.feed')),
@@ -362,22 +353,17 @@ class PostFrontendTests(FrontendTestCase):
         user1 = create_account('user1', 'user1@pjuu.com', 'Password')
         activate(user1)
         # Log the user in
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Disable feed images
         update_profile_settings(user1, hide_feed_images=True)
 
         # Upload another image
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.png', 'rb').read())
+        image = io.BytesIO(self.OTTER_PNG)
         post1 = create_post(user1, 'user1', 'Test post', upload=image)
         self.assertIsNotNone(post1)
 
-        post = get_post(post1)
+        post = get_post(post1, fields={'upload': True})
         resp = self.client.get(url_for('users.feed'))
         self.assertIn('<!-- upload:post:{} -->'.format(post1),
                       resp.get_data(as_text=True))
@@ -392,8 +378,7 @@ class PostFrontendTests(FrontendTestCase):
         activate(user1)
 
         # Create the post with an upload to get
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
+        image = io.BytesIO(self.OTTER_JPG)
         post1 = create_post(user1, 'user1', 'Test post', upload=image)
         self.assertIsNotNone(post1)
 
@@ -406,11 +391,7 @@ class PostFrontendTests(FrontendTestCase):
         self.assertEqual(resp.status_code, 200)
 
         # Log in as user1 and get the upload
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         resp = self.client.get(storage.url_for('posts.get_upload',
                                                filename=post.get('upload')))
@@ -444,10 +425,7 @@ class PostFrontendTests(FrontendTestCase):
         self.assertIn('Test post', resp.get_data(as_text=True))
 
         # Sign in
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         # Ensure that we can now see the endpoint
         resp = self.client.get(url_for('posts.view_post', username='user1',
@@ -474,10 +452,7 @@ class PostFrontendTests(FrontendTestCase):
 
         # Let's logout and log in as test2
         self.client.get(url_for('auth.signout'))
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        })
+        self.login_as(user2)
         # Check that we can see the comment
         resp = self.client.get(url_for('posts.view_post', username='user1',
                                        post_id=post1),
@@ -552,10 +527,7 @@ class PostFrontendTests(FrontendTestCase):
         for i in range(99, 75, -1):
             self.assertIn('Reply {}'.format(i), resp.get_data(as_text=True))
 
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         resp = self.client.get(url_for('posts.view_post', username='user1',
                                        post_id=post1),
@@ -619,11 +591,7 @@ class PostFrontendTests(FrontendTestCase):
         # Activate the account
         activate(user1)
         # Log the user in
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Create a post to comment on we will do this in the backend to get
         # the pid
@@ -714,8 +682,7 @@ class PostFrontendTests(FrontendTestCase):
                       resp.get_data(as_text=True))
 
         # Test replies with an image
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
+        image = io.BytesIO(self.OTTER_JPG)
         resp = self.client.post(
             url_for('posts.post', username='user1', post_id=post1),
             data={
@@ -729,23 +696,18 @@ class PostFrontendTests(FrontendTestCase):
 
         # So that we can check the data is in the templates, upload a post
         # in the backend and ensure it appears where it should
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.png', 'rb').read())
+        image = io.BytesIO(self.OTTER_PNG)
         reply_img = create_post(user1, 'user1', 'Test post', reply_to=post1,
                                 upload=image)
         self.assertIsNotNone(reply_img)
-        reply = get_post(reply_img)
+        reply = get_post(reply_img, fields={'upload': True})
         resp = self.client.get(url_for('posts.view_post', username='user1',
                                        post_id=post1))
-        self.assertIn('<!-- upload:reply:{} -->'.format(reply_img),
-                      resp.get_data(as_text=True))
-        self.assertIn('<img src="{}"/>'.format(
-            storage.url_for('posts.get_upload', filename=reply.get('upload'))),
-            resp.get_data(as_text=True))
+        self.assertUploadShown(resp, reply_img, reply.get('upload'),
+                               kind='reply')
 
         # Ensure that posting an image with no text allows it
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
+        image = io.BytesIO(self.OTTER_JPG)
         resp = self.client.post(
             url_for('posts.post', username='user1', post_id=post1),
             data={
@@ -757,8 +719,7 @@ class PostFrontendTests(FrontendTestCase):
         self.assertEqual(resp.status_code, 200)
 
         # Ensure that an invalid filename is stopped by the forms
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
+        image = io.BytesIO(self.OTTER_JPG)
         resp = self.client.post(
             url_for('posts.post', username='user1', post_id=post1),
             data={
@@ -811,11 +772,7 @@ class PostFrontendTests(FrontendTestCase):
 
         # We will now actually test the frontend
         # Log in as user 1
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user1)
 
         # Lets ensure both vote links are there
         resp = self.client.get(url_for('posts.view_post', username='user2',
@@ -950,10 +907,7 @@ class PostFrontendTests(FrontendTestCase):
 
         # Log in as user3 and try and catch some situations which are missing
         # from coverage.
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user3',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user3)
         # Downvote user1's post
         resp = self.client.post(url_for('posts.downvote', username='user1',
                                         post_id=post1),
@@ -971,10 +925,7 @@ class PostFrontendTests(FrontendTestCase):
         # reversed. Becasue we reversed them there is no vote logged so
         # no time out.
         self.client.get(url_for('auth.signout'), follow_redirects=True)
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         resp = self.client.post(url_for('posts.upvote', username='user2',
                                         post_id=post2),
@@ -1022,11 +973,7 @@ class PostFrontendTests(FrontendTestCase):
         post1 = create_post(user1, 'user1', 'Post user 1')
         post2 = create_post(user2, 'user2', 'Post user 2')
 
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertEqual(resp.status_code, 200)
+        self.login_as(user2)
 
         # Ensure we can up vote via XHR
         resp = self.client.post(
@@ -1241,10 +1188,7 @@ class PostFrontendTests(FrontendTestCase):
         self.assertEqual(m.db.posts.find_one({'_id': post1}).get('flags'), 1)
 
         # Ensure a non-OP user can not unflag posts
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user2)
         resp = self.client.get(url_for('posts.unflag_post', post_id=post1))
 
         self.assertEqual(resp.status_code, 403)
@@ -1252,10 +1196,7 @@ class PostFrontendTests(FrontendTestCase):
         self.client.get(url_for('auth.signout'))
 
         # Ensure user1 (op) can unflag a post
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         resp = self.client.get(url_for('posts.unflag_post', post_id=post1),
                                follow_redirects=True)
@@ -1287,11 +1228,7 @@ class PostFrontendTests(FrontendTestCase):
         create_post(user3, 'user3', 'Test post, user 3')
 
         # Log in as user 1
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertIn('<h1>Feed</h1>', resp.get_data(as_text=True))
+        self.login_as(user1)
 
         # Visit our own post and ensure the delete button is there
         resp = self.client.get(url_for('posts.view_post', username='user1',
@@ -1396,12 +1333,7 @@ class PostFrontendTests(FrontendTestCase):
         # Log in as user test2 and delete user test3's comment
         # Test2 is the post author so they should be able to delete not their
         # own comments
-
-        resp = self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        }, follow_redirects=True)
-        self.assertIn('<h1>Feed</h1>', resp.get_data(as_text=True))
+        self.login_as(user2)
 
         # Goto test2s post
         resp = self.client.get(url_for('posts.view_post', username='user2',
@@ -1451,10 +1383,7 @@ class PostFrontendTests(FrontendTestCase):
 
         # Login as test1
         # Don't bother testing this AGAIN
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        })
+        self.login_as(user1)
 
         # Visit the posts page and ensure unsubscribe button is there
         # We should have been subscribed when create_post was run above
@@ -1478,10 +1407,7 @@ class PostFrontendTests(FrontendTestCase):
         self.client.get(url_for('auth.signout'))
 
         # Log in as user2 an ensure that they can see the subscription button
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        })
+        self.login_as(user2)
         resp = self.client.get(url_for('posts.view_post', username='user1',
                                        post_id=post1))
         self.assertEqual(resp.status_code, 200)
@@ -1499,10 +1425,7 @@ class PostFrontendTests(FrontendTestCase):
         self.client.get(url_for('auth.signout'))
 
         # Log in as user3
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user3',
-            'password': 'Password'
-        })
+        self.login_as(user3)
         # Create a comment in the backend as user3 so that we can check if they
         # become subscribed to the post
         create_post(user3, 'user3', "Test comment", post1)
@@ -1526,52 +1449,6 @@ class PostFrontendTests(FrontendTestCase):
         self.assertIn("Test post, for cant unsubscribe",
                       resp.get_data(as_text=True))
 
-    def test_template_filters(self):
-        """
-        Small tests for the template filters. There is only a couple which
-        are not tested by the rest of the unit tests.
-
-        We will just test these by calling them directly not through the site.
-        """
-        # Test timeify with an invalid value (can't be converted to int)
-        time_str = timeify_filter("None")
-        self.assertEqual(time_str, 'Err')
-        # Test timeify with an invaid type
-        time_str = timeify_filter(None)
-        self.assertEqual(time_str, 'Err')
-        # Test that it works correctly
-        # With an int
-        time_str = timeify_filter(1412271814)
-        self.assertNotEqual(time_str, 'Err')
-        # With a string
-        time_str = timeify_filter('1412271814')
-        self.assertNotEqual(time_str, 'Err')
-
-        # Test millify
-        # Check incorrect type
-        num_str = millify_filter(None)
-        self.assertEqual(num_str, 'Err')
-        # Check value's that can't be turned in to ints
-        # Str
-        num_str = millify_filter("None")
-        self.assertEqual(num_str, 'Err')
-        # Check it does actually work
-        # Positive
-        num_str = millify_filter(1000)
-        self.assertEqual(num_str, "1K")
-        # Negative
-        num_str = millify_filter(-1000)
-        self.assertEqual(num_str, "-1K")
-
-        num_str = millify_filter(12500000)
-        self.assertEqual(num_str, "12.5M")
-
-        num_str = millify_filter(-1200)
-        self.assertEqual(num_str, "-1.2K")
-
-        num_str = millify_filter(3800)
-        self.assertEqual(num_str, "3.8K")
-
     def test_postify(self):
         """Test that postify renders posts correctly when the correct
         informations is attached.
@@ -1583,10 +1460,7 @@ class PostFrontendTests(FrontendTestCase):
         user1 = create_account('user1', 'user1@pjuu.com', 'Password')
         activate(user1)
 
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        })
+        self.login_as(user1)
 
         # Create a post with a user that does not exist there should be no
         # rendering involved
@@ -1641,10 +1515,7 @@ class PostFrontendTests(FrontendTestCase):
         # Sign in
         user1 = create_account('user1', 'user1@pjuu.com', 'Password')
         activate(user1)
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         # Check all conditions which will result in a 404
         resp = self.client.get(url_for('posts.hashtags'))
@@ -1683,10 +1554,7 @@ class PostFrontendTests(FrontendTestCase):
 
         post1 = create_post(user1, 'user1', 'Approved post',
                             permission=k.PERM_APPROVED)
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user2)
 
         resp = self.client.get(url_for('posts.view_post', username='user1',
                                post_id=post1))
@@ -1750,10 +1618,7 @@ class PostFrontendTests(FrontendTestCase):
 
         # Signout as user2 and ensure user1 can comment on the post.
         self.client.get(url_for('auth.signout'))
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         resp = self.client.post(url_for('posts.post', username='user1',
                                 post_id=post1), data={
@@ -1768,10 +1633,7 @@ class PostFrontendTests(FrontendTestCase):
         user1 = create_account('user1', 'user1@pjuu.com', 'Password')
         activate(user1)
 
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user1',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user1)
 
         resp = self.client.post(url_for('posts.post'), data={
             'body': 'Test post',
@@ -1812,10 +1674,7 @@ class PostFrontendTests(FrontendTestCase):
         self.assertNotIn('trusted post #3', resp.get_data(as_text=True))
 
         # Test logged in user
-        self.client.post(url_for('auth.signin'), data={
-            'username': 'user2',
-            'password': 'Password'
-        }, follow_redirects=True)
+        self.login_as(user2)
 
         resp = self.client.get(url_for('posts.global_feed'))
         self.assertIn('public post #1', resp.get_data(as_text=True))
@@ -1829,3 +1688,56 @@ class PostFrontendTests(FrontendTestCase):
         self.assertNotIn('trusted post #1', resp.get_data(as_text=True))
         self.assertNotIn('trusted post #2', resp.get_data(as_text=True))
         self.assertNotIn('trusted post #3', resp.get_data(as_text=True))
+
+
+class TemplateFilterTests(unittest.TestCase):
+    """The template filters are plain functions, they need no app or
+    databases.
+
+    """
+
+    def test_template_filters(self):
+        """
+        Small tests for the template filters. There is only a couple which
+        are not tested by the rest of the unit tests.
+
+        We will just test these by calling them directly not through the site.
+        """
+        # Test timeify with an invalid value (can't be converted to int)
+        time_str = timeify_filter("None")
+        self.assertEqual(time_str, 'Err')
+        # Test timeify with an invaid type
+        time_str = timeify_filter(None)
+        self.assertEqual(time_str, 'Err')
+        # Test that it works correctly
+        # With an int
+        time_str = timeify_filter(1412271814)
+        self.assertNotEqual(time_str, 'Err')
+        # With a string
+        time_str = timeify_filter('1412271814')
+        self.assertNotEqual(time_str, 'Err')
+
+        # Test millify
+        # Check incorrect type
+        num_str = millify_filter(None)
+        self.assertEqual(num_str, 'Err')
+        # Check value's that can't be turned in to ints
+        # Str
+        num_str = millify_filter("None")
+        self.assertEqual(num_str, 'Err')
+        # Check it does actually work
+        # Positive
+        num_str = millify_filter(1000)
+        self.assertEqual(num_str, "1K")
+        # Negative
+        num_str = millify_filter(-1000)
+        self.assertEqual(num_str, "-1K")
+
+        num_str = millify_filter(12500000)
+        self.assertEqual(num_str, "12.5M")
+
+        num_str = millify_filter(-1200)
+        self.assertEqual(num_str, "-1.2K")
+
+        num_str = millify_filter(3800)
+        self.assertEqual(num_str, "3.8K")
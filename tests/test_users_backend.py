@@ -18,7 +18,7 @@ from pjuu.users.backend import (
     get_profile, search, is_following, get_following, get_followers,
     new_alerts, FollowAlert, get_alerts, follow_user, unfollow_user,
     delete_alert, get_user, approve_user, unapprove_user, is_trusted,
-    get_trusted
+    get_trusted, top_users_by_score, get_is_following, get_is_trusted
 )
 from pjuu.auth.utils import get_uid_username
 
@@ -108,6 +108,9 @@ class BackendTests(BackendTestCase):
 
         # Make sure is_following() returns correctly
         self.assertTrue(is_following(user1, user2))
+        self.assertEqual(get_is_following(user1, [user2, k.NIL_VALUE]),
+                         {user2: True, k.NIL_VALUE: False})
+        self.assertEqual(get_is_following(user1, []), {})
         self.assertTrue(is_following(user2, user1))
 
         # User 1 unfollow user 2 and ensure the sorted sets are updated
@@ -157,6 +160,7 @@ class BackendTests(BackendTestCase):
         # Follow each other.
         self.assertTrue(follow_user(user1, user2))
         self.assertTrue(follow_user(user2, user1))
+        self.assertTrue(approve_user(user2, user1))
 
         # Manually delete user1
         m.db.users.remove({'_id': user1})
@@ -169,6 +173,8 @@ class BackendTests(BackendTestCase):
         # is not there
         self.assertEqual(get_followers(user2).total, 0)
         self.assertEqual(get_following(user2).total, 0)
+        self.assertEqual(get_trusted(user2).total, 0)
+        self.assertEqual(r.zcard(k.USER_APPROVED.format(user2)), 0)
 
     def test_approved_unapproved_is_trusted(self):
         """Ensure a user can trust and un-trust a follower. Also test the
@@ -193,6 +199,9 @@ class BackendTests(BackendTestCase):
         follow_user(user2, user1)
         self.assertTrue(approve_user(user1, user2))
         self.assertTrue(is_trusted(user1, user2))
+        self.assertEqual(get_is_trusted(user1, [user2, user3]),
+                         {user2: True, user3: False})
+        self.assertEqual(get_is_trusted(user1, []), {})
 
         # Try an un-approved a non follower
         self.assertFalse(is_trusted(user1, user3))
@@ -293,6 +302,9 @@ class BackendTests(BackendTestCase):
         activate(user1)
         self.assertEqual(len(search('user1').items), 1)
         self.assertEqual(search('user1').total, 1)
+        # Only the fields needed to list the user are returned
+        self.assertEqual(search('user1').items[0].get('username'), 'user1')
+        self.assertIsNone(search('user1').items[0].get('password'))
 
         # Ensure partial match
         self.assertEqual(len(search('use').items), 1)
@@ -499,5 +511,25 @@ class BackendTests(BackendTestCase):
         # Test per page
         trusted_pagination = get_trusted(user1, per_page=10)
         self.assertEqual(trusted_pagination.total, 50)
-        # The answer is 5 because of the self cleaning action
-        self.assertEqual(len(trusted_pagination.items), 5)
+        # Deleted users are removed from the approved list straight away
+        self.assertEqual(len(trusted_pagination.items), 10)
+
+    def test_top_users_by_score(self):
+        """Ensure the top users are returned and cached"""
+        user1 = create_account('user1', 'user1@pjuu.com', 'Password')
+        user2 = create_account('user2', 'user2@pjuu.com', 'Password')
+        m.db.users.update({'_id': user2}, {'$set': {'score': 10}})
+
+        top_users = top_users_by_score()
+        self.assertEqual([user.get('_id') for user in top_users],
+                         [user2, user1])
+        self.assertEqual(top_users[0].get('username'), 'user2')
+        self.assertGreater(r.ttl(k.TOP_USERS.format(5)), 0)
+
+        # The cached list is used until it expires
+        m.db.users.update({'_id': user1}, {'$set': {'score': 20}})
+        self.assertEqual(top_users_by_score(), top_users)
+
+        r.delete(k.TOP_USERS.format(5))
+        self.assertEqual([user.get('_id') for user in top_users_by_score()],
+                         [user1, user2])
@@ -7,8 +7,6 @@
 
 """
 
-import io
-
 from flask import url_for
 import json
 
@@ -422,12 +420,10 @@ class FrontendTests(FrontendTestCase):
         })
 
         # Ensure user avatar appear in the search when searching for hashtags
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
-
-        self.client.post(url_for('users.settings_profile'), data={
-            'upload': (image, 'otter.png')
-        }, follow_redirects=True)
+        with open('tests/upload_test_files/otter.jpg', 'rb') as image:
+            self.client.post(url_for('users.settings_profile'), data={
+                'upload': (image, 'otter.png')
+            }, follow_redirects=True)
 
         # Get the user so we can see if the avatar is appearing
         user = get_user(user1)
@@ -622,6 +618,13 @@ class FrontendTests(FrontendTestCase):
         self.assertEqual(
             json.loads(resp.get_data(as_text=True)).get('new_alerts'), 2)
 
+        # Nothing has changed so the browsers copy can be used
+        resp = self.client.get(url_for('users.new_alerts'), headers={
+            'If-None-Match': resp.headers.get('ETag')
+        })
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp.get_data(as_text=True), '')
+
         resp = self.client.get(url_for('users.alerts'))
         # We don't know the alert ID but we can check that one is there by
         # looking for the comment in test mode
@@ -777,12 +780,10 @@ class FrontendTests(FrontendTestCase):
         self.assertIsNone(user.get('avatar'))
 
         # Create the file
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
-
-        resp = self.client.post(url_for('users.settings_profile'), data={
-            'upload': (image, 'otter.png')
-        }, follow_redirects=True)
+        with open('tests/upload_test_files/otter.jpg', 'rb') as image:
+            resp = self.client.post(url_for('users.settings_profile'), data={
+                'upload': (image, 'otter.png')
+            }, follow_redirects=True)
 
         user = get_user(user1)
 
@@ -797,12 +798,10 @@ class FrontendTests(FrontendTestCase):
         self.assertEqual(resp.status_code, 200)
 
         # upload another and ensure there is only one in GridFs
-        image = io.BytesIO(
-            open('tests/upload_test_files/otter.jpg', 'rb').read())
-
-        resp = self.client.post(url_for('users.settings_profile'), data={
-            'upload': (image, 'otter.png')
-        }, follow_redirects=True)
+        with open('tests/upload_test_files/otter.jpg', 'rb') as image:
+            resp = self.client.post(url_for('users.settings_profile'), data={
+                'upload': (image, 'otter.png')
+            }, follow_redirects=True)
 
         user = get_user(user1)
         self.assertTrue(storage.exists(user.get('avatar')))